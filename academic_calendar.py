@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Academic Calendar
+Term and holiday date ranges in a sorted interval index, so the scheduler can skip days without classes
+"""
+
+import json
+import os
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_CALENDAR_PATH = os.getenv('ACADEMIC_CALENDAR_PATH')
+
+# (first_day, last_day), both inclusive
+DateRange = Tuple[date, date]
+
+
+class IntervalIndex:
+    """Non-overlapping day ranges as sorted ordinals; lookups are one binary search"""
+
+    def __init__(self, ranges: Iterable[DateRange] = ()):
+        merged: List[List[int]] = []
+        for first, last in sorted((first.toordinal(), last.toordinal()) for first, last in ranges):
+            if last < first:
+                continue
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        self._starts = [first for first, _ in merged]
+        self._ends = [last for _, last in merged]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _position(self, day: date) -> int:
+        """Index of the range containing day, or -1"""
+        i = bisect_right(self._starts, day.toordinal()) - 1
+        if i >= 0 and day.toordinal() <= self._ends[i]:
+            return i
+        return -1
+
+    def contains(self, day: date) -> bool:
+        return self._position(day) >= 0
+
+    def range_end(self, day: date) -> Optional[date]:
+        """Last day of the range containing day"""
+        i = self._position(day)
+        return date.fromordinal(self._ends[i]) if i >= 0 else None
+
+    def next_start(self, day: date) -> Optional[date]:
+        """First day of the earliest range starting after day"""
+        i = bisect_right(self._starts, day.toordinal())
+        return date.fromordinal(self._starts[i]) if i < len(self._starts) else None
+
+
+class AcademicCalendar:
+    """A day is active when it falls inside a term (if any terms are set) and outside every holiday"""
+
+    def __init__(self, terms: Iterable[DateRange] = (), holidays: Iterable[DateRange] = ()):
+        self.terms = IntervalIndex(terms)
+        self.holidays = IntervalIndex(holidays)
+
+    def is_active(self, day: date) -> bool:
+        if len(self.terms) and not self.terms.contains(day):
+            return False
+        return not self.holidays.contains(day)
+
+    def next_active(self, day: date) -> Optional[date]:
+        """Earliest active day on or after day, jumping whole ranges; None once the last term is over"""
+        while True:
+            if len(self.terms) and not self.terms.contains(day):
+                day = self.terms.next_start(day)
+                if day is None:
+                    return None
+            holiday_end = self.holidays.range_end(day)
+            if holiday_end is None:
+                return day
+            day = holiday_end + timedelta(days=1)
+
+
+def _ranges(entries: Iterable[Dict[str, Any]]) -> List[DateRange]:
+    return [(date.fromisoformat(entry['start']), date.fromisoformat(entry['end'])) for entry in entries]
+
+
+def load_calendar(path: Optional[str] = DEFAULT_CALENDAR_PATH) -> Optional[AcademicCalendar]:
+    """Read {"terms": [{"start", "end"}], "holidays": [{"start", "end"}]} from a JSON file"""
+    if not path:
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        calendar = AcademicCalendar(_ranges(data.get('terms', [])), _ranges(data.get('holidays', [])))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error loading academic calendar {path}: {e}")
+        return None
+    print(f"Loaded academic calendar: {len(calendar.terms)} terms, {len(calendar.holidays)} holiday ranges")
+    return calendar
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+AI Gateway
+Async Gemini calls under a process-wide concurrency cap, with timeouts and queue/generation timings
+Replies can be awaited whole (generate) or read chunk by chunk as they are produced (stream)
+"""
+
+import asyncio
+import os
+import time as _time
+from collections import Counter
+from typing import AsyncIterator, Optional
+
+from scheduler_metrics import DELIVERY_BOUNDS, HistogramFamily
+
+AI_CONCURRENCY = int(os.getenv('AI_CONCURRENCY', '4'))
+AI_TIMEOUT_SECONDS = float(os.getenv('AI_TIMEOUT_SECONDS', '30'))
+
+QUEUE_WAIT = 'queue_wait'
+GENERATION = 'generation'
+FIRST_CHUNK = 'first_chunk'
+
+
+class AITimeout(TimeoutError):
+    pass
+
+
+class AIGateway:
+    """await gateway.generate(prompt), or async for chunk in gateway.stream(prompt), instead of model.generate_content(prompt)"""
+
+    def __init__(self, model, concurrency: int = AI_CONCURRENCY, timeout: float = AI_TIMEOUT_SECONDS):
+        self.model = model
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        self.timings = HistogramFamily(DELIVERY_BOUNDS)  # Seconds per stage: queue_wait, first_chunk, generation
+        self.outcomes = Counter()  # ok, timeout, cancelled, error
+        self.waiting = 0
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generated text; raises AITimeout, and cancelling the caller cancels the request"""
+        timeout = self.timeout if timeout is None else timeout
+        started = await self._acquire()
+        try:
+            response = await asyncio.wait_for(
+                self.model.generate_content_async(prompt, request_options={'timeout': timeout}),
+                timeout
+            )
+            text = response.text
+        except asyncio.TimeoutError:
+            self.outcomes['timeout'] += 1
+            raise AITimeout(f"AI reply took longer than {timeout:g}s") from None
+        except asyncio.CancelledError:
+            self.outcomes['cancelled'] += 1
+            raise
+        except Exception:
+            self.outcomes['error'] += 1
+            raise
+        finally:
+            self.timings.observe(GENERATION, _time.perf_counter() - started)
+            self._slots.release()
+        self.outcomes['ok'] += 1
+        return text
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Text chunks as Gemini produces them; the timeout covers the whole reply, not each chunk"""
+        timeout = self.timeout if timeout is None else timeout
+        started = await self._acquire()
+        deadline = started + timeout
+        first = True
+        try:
+            response = await asyncio.wait_for(
+                self.model.generate_content_async(prompt, stream=True, request_options={'timeout': timeout}),
+                timeout
+            )
+            chunks = response.__aiter__()
+            while True:
+                remaining = deadline - _time.perf_counter()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                if first:
+                    self.timings.observe(FIRST_CHUNK, _time.perf_counter() - started)
+                    first = False
+                if chunk.text:
+                    yield chunk.text
+        except asyncio.TimeoutError:
+            self.outcomes['timeout'] += 1
+            raise AITimeout(f"AI reply took longer than {timeout:g}s") from None
+        except (asyncio.CancelledError, GeneratorExit):
+            # GeneratorExit: the reader stopped early
+            self.outcomes['cancelled'] += 1
+            raise
+        except Exception:
+            self.outcomes['error'] += 1
+            raise
+        finally:
+            self.timings.observe(GENERATION, _time.perf_counter() - started)
+            self._slots.release()
+        self.outcomes['ok'] += 1
+
+    async def _acquire(self) -> float:
+        """Wait for a free slot; returns when the request started"""
+        queued = _time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        except asyncio.CancelledError:
+            self.outcomes['cancelled'] += 1
+            raise
+        finally:
+            self.waiting -= 1
+        started = _time.perf_counter()
+        self.timings.observe(QUEUE_WAIT, started - queued)
+        return started
+
+    def prometheus(self) -> str:
+        lines = []
+        for stage, help_text in ((QUEUE_WAIT, 'Seconds an AI request waited for a free slot'),
+                                 (FIRST_CHUNK, 'Seconds until the first chunk of a streamed AI reply'),
+                                 (GENERATION, 'Seconds spent generating an AI reply')):
+            name = f"ai_{stage}_seconds"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            histogram = self.timings.histograms.get(stage)
+            if histogram:
+                lines.extend(histogram.prometheus_lines(name, {}))
+        lines.append("# HELP ai_requests_total AI requests by outcome")
+        lines.append("# TYPE ai_requests_total counter")
+        for outcome, count in sorted(self.outcomes.items()):
+            lines.append(f'ai_requests_total{{outcome="{outcome}"}} {count}')
+        lines.append("# HELP ai_requests_waiting AI requests waiting for a free slot")
+        lines.append("# TYPE ai_requests_waiting gauge")
+        lines.append(f"ai_requests_waiting {self.waiting}")
+        return "\n".join(lines) + "\n"
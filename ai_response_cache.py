@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+AI Response Cache
+Answers repeated questions without a model round-trip, keyed by the normalized question and its context
+"""
+
+import hashlib
+import os
+import re
+import time as _time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+AI_CACHE_SIZE = int(os.getenv('AI_CACHE_SIZE', '512'))
+AI_CACHE_TTL_SECONDS = float(os.getenv('AI_CACHE_TTL_SECONDS', '1800'))
+
+# (user_id, normalized question, context hash)
+CacheKey = Tuple[str, str, str]
+
+
+def normalize_question(question: str) -> str:
+    """Case, punctuation, Arabic diacritics and spacing do not change what is being asked"""
+    text = unicodedata.normalize('NFKC', question).casefold()
+    text = ''.join(
+        ' ' if unicodedata.category(ch).startswith('P') else ch
+        for ch in text
+        if unicodedata.category(ch) != 'Mn'  # Combining marks such as tashkeel
+    )
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def context_hash(context: str) -> str:
+    return hashlib.sha256(context.encode('utf-8')).hexdigest()[:16]
+
+
+class ResponseCache:
+    """LRU of AI replies; entries also expire after ttl seconds"""
+
+    def __init__(self, maxsize: int = AI_CACHE_SIZE, ttl: float = AI_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = _time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: 'OrderedDict[CacheKey, Tuple[float, str]]' = OrderedDict()  # key -> (expires_at, reply)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, user_id: str, question: str, context: str) -> CacheKey:
+        """context should hold everything the reply depends on besides the question (date, schedule and notes versions)"""
+        return (str(user_id), normalize_question(question), context_hash(context))
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: CacheKey, reply: str):
+        """Store a finished reply; empty ones are not worth replaying and are skipped"""
+        if not reply or not reply.strip():
+            return
+        self._entries[key] = (self.clock() + self.ttl, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop every reply for a user whose classes or notes changed; returns how many"""
+        stale = [key for key in self._entries if key[0] == str(user_id)]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def prometheus(self) -> str:
+        return "\n".join([
+            "# HELP ai_cache_lookups_total AI reply cache lookups by result",
+            "# TYPE ai_cache_lookups_total counter",
+            f'ai_cache_lookups_total{{result="hit"}} {self.hits}',
+            f'ai_cache_lookups_total{{result="miss"}} {self.misses}',
+            "# HELP ai_cache_entries AI replies currently cached",
+            "# TYPE ai_cache_entries gauge",
+            f"ai_cache_entries {len(self._entries)}",
+        ]) + "\n"
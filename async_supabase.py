@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Async Supabase
+Runs the synchronous supabase client's queries on a bounded thread pool, with a timeout per call
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+DB_THREADS = int(os.getenv('DB_THREADS', '8'))
+DB_TIMEOUT_SECONDS = float(os.getenv('DB_TIMEOUT_SECONDS', '10'))
+
+
+class DatabaseTimeout(TimeoutError):
+    pass
+
+
+class AsyncSupabase:
+    """await db.execute(query) instead of query.execute(), so a slow round-trip never blocks the event loop"""
+
+    def __init__(self, max_workers: int = DB_THREADS, timeout: float = DB_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        # At most max_workers queries run at once; the rest wait for a thread without blocking the loop
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='supabase')
+        self.calls = 0
+        self.timeouts = 0
+
+    async def run(self, fn: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        """Call fn(*args) on the pool; raises DatabaseTimeout if it takes longer than timeout"""
+        timeout = self.timeout if timeout is None else timeout
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(self._executor, fn, *args), timeout)
+        except asyncio.TimeoutError:
+            # The thread keeps going until the HTTP client's own timeout; only the caller stops waiting
+            self.timeouts += 1
+            raise DatabaseTimeout(f"Database call timed out after {timeout:g}s") from None
+
+    async def execute(self, query, timeout: Optional[float] = None):
+        """Execute a PostgREST query builder, e.g. db.execute(supabase.table('classes').select('*'))"""
+        return await self.run(query.execute, timeout=timeout)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
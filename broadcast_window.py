@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Broadcast Window
+Spreads the morning and evening digests over a window, each user at the same offset every day
+"""
+
+import os
+from collections import Counter
+from typing import Dict, Iterable
+
+from shard_leases import stable_hash
+
+BROADCAST_WINDOW_MINUTES = int(os.getenv('BROADCAST_WINDOW_MINUTES', '20'))
+# Digests starting in any one second, per timezone; extra users overflow past the end of the window
+BROADCAST_MAX_PER_SECOND = int(os.getenv('BROADCAST_MAX_PER_SECOND', '20'))
+
+
+def spread_offsets(user_ids: Iterable[str], window_minutes: int = BROADCAST_WINDOW_MINUTES,
+                   max_per_second: int = BROADCAST_MAX_PER_SECOND) -> Dict[str, int]:
+    """Seconds after the broadcast time for every user
+
+    Each user is hashed to a second of the window; a user landing on a full second moves to the
+    next one with room, past the end of the window if it is full. The same users get the same
+    offsets on every run and every day, and a user joining or leaving only moves the few queued
+    behind them. A window of 0 minutes sends every digest at the broadcast time itself.
+    """
+    if window_minutes <= 0:
+        return dict.fromkeys(user_ids, 0)
+    window = max(1, window_minutes * 60)
+    cap = max(1, max_per_second)
+    taken = Counter()
+    offsets = {}
+    # In hash order, so the result does not depend on the order users were loaded in
+    for position, user_id in sorted((stable_hash(f"broadcast:{user_id}") % window, user_id)
+                                    for user_id in set(user_ids)):
+        offset = position
+        while taken[offset] >= cap:
+            offset += 1
+        taken[offset] += 1
+        offsets[user_id] = offset
+    return offsets
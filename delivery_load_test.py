@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Delivery Load Test
+Bursts messages through the real delivery path against a TelegramStub and reports throughput and tail latency
+"""
+
+import asyncio
+import os
+import time as _time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from scheduler_metrics import Histogram
+from telegram_stub import TelegramStub
+
+LOAD_TEST_MESSAGES = int(os.getenv('LOAD_TEST_MESSAGES', '1000'))
+LOAD_TEST_CHATS = int(os.getenv('LOAD_TEST_CHATS', '1000'))
+STUB_LATENCY_MS = float(os.getenv('STUB_LATENCY_MS', '50'))
+STUB_JITTER_MS = float(os.getenv('STUB_JITTER_MS', '20'))
+STUB_ERROR_RATE = float(os.getenv('STUB_ERROR_RATE', '0'))
+STUB_RETRY_AFTER_RATE = float(os.getenv('STUB_RETRY_AFTER_RATE', '0'))
+STUB_RETRY_AFTER_SECONDS = int(os.getenv('STUB_RETRY_AFTER_SECONDS', '1'))
+
+# Finer than the scheduler's lateness buckets: a healthy send takes tens of milliseconds
+LATENCY_BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300)
+
+
+def stub_from_env(seed: int = 0) -> TelegramStub:
+    return TelegramStub(
+        latency_seconds=STUB_LATENCY_MS / 1000,
+        jitter_seconds=STUB_JITTER_MS / 1000,
+        error_rate=STUB_ERROR_RATE,
+        retry_after_rate=STUB_RETRY_AFTER_RATE,
+        retry_after_seconds=STUB_RETRY_AFTER_SECONDS,
+        seed=seed,
+    )
+
+
+@dataclass
+class LoadTestResult:
+    messages: int
+    delivered: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    latency: Histogram = field(default_factory=lambda: Histogram(LATENCY_BOUNDS))
+    sent: Optional[int] = None  # Telegram messages actually sent, when a coalescer merged some
+    merged: int = 0
+
+    def report(self) -> str:
+        rate = self.delivered / self.elapsed if self.elapsed else 0.0
+        lines = [
+            f"Delivered {self.delivered}/{self.messages} ({self.failed} failed) in {self.elapsed:.2f}s: "
+            f"{rate:,.1f} msgs/s",
+        ]
+        if self.sent is not None:
+            sent_rate = self.sent / self.elapsed if self.elapsed else 0.0
+            lines.append(f"Sent {self.sent} Telegram messages ({sent_rate:,.1f}/s); "
+                         f"{self.merged} messages merged into others")
+        lines.append(f"Latency: {self.latency.summary()}")
+        return "\n".join(lines)
+
+
+async def drive(send: Callable[[int], Awaitable[bool]], messages: int = LOAD_TEST_MESSAGES) -> LoadTestResult:
+    """Start every send at once, like a broadcast; send(n) returns whether message n was delivered"""
+    result = LoadTestResult(messages)
+
+    async def timed(n: int):
+        started = _time.perf_counter()
+        try:
+            ok = await send(n)
+        except Exception:
+            ok = False
+        result.latency.observe(_time.perf_counter() - started)
+        if ok:
+            result.delivered += 1
+        else:
+            result.failed += 1
+
+    started = _time.perf_counter()
+    await asyncio.gather(*(timed(n) for n in range(messages)))
+    result.elapsed = _time.perf_counter() - started
+    return result
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Digest Messages
+Reminder texts rendered when the schedule loads and kept in a small LRU, so sends only look them up
+"""
+
+import os
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from reminder_engine import PRECLASS, after_offsets, before_offsets
+from schedule_index import WEEKDAYS, ScheduleIndex, display_time
+
+DEFAULT_LOCALE = 'en'
+DEFAULT_CACHE_SIZE = int(os.getenv('DIGEST_CACHE_SIZE', '16384'))  # One day's texts for about 4000 users
+UPLOAD_LINK = "📝 **Upload your notes:** https://YOUR-VERCEL-URL.vercel.app"
+JUST_ENDED_MINUTES = 15  # Later after-class reminders say how long ago the class ended
+
+TEMPLATES = {
+    'en': {
+        'morning_header': "🌅 Good Morning! Here are your classes for today:\n\n",
+        'morning_empty': "🌅 Good Morning! 📅 No classes scheduled for today!",
+        'morning_footer': "Have a great day! 🎓\n\n" + UPLOAD_LINK,
+        'evening_header': "🌙 End of Day Summary\n\n",
+        'evening_classes': "📅 **Tomorrow's Classes:**\n",
+        'evening_empty': "📅 No classes scheduled for tomorrow!\n\n",
+        'evening_footer': "Sweet dreams! 😴\n\n" + UPLOAD_LINK,
+        'class_block': "📚 **{class_name}** ({class_code})\n⏰ Time: {start} - {end}\n📍 Location: {location}\n\n",
+        'preclass': ("🔔 **Class Reminder**\n\n"
+                     "📚 **{class_name}** ({class_code})\n"
+                     "⏰ Starts in a few minutes: {start} - {end}\n"
+                     "📍 Location: {location}\n\n"
+                     "Don't forget to bring your materials! 📝"),
+        'preclass_in': ("🔔 **Class Reminder**\n\n"
+                        "📚 **{class_name}** ({class_code})\n"
+                        "⏰ Starts in {minutes} minutes: {start} - {end}\n"
+                        "📍 Location: {location}\n\n"
+                        "Don't forget to bring your materials! 📝"),
+        'preclass_now': ("🔔 **Class Reminder**\n\n"
+                         "📚 **{class_name}** ({class_code})\n"
+                         "⏰ Starting now: {start} - {end}\n"
+                         "📍 Location: {location}"),
+        'afterclass': ("📝 **Class Finished**\n\n"
+                       "📚 **{class_name}** ({class_code}) just ended.\n\n"
+                       "Don't forget to upload your notes while they're fresh in your mind! 🧠\n\n"
+                       + UPLOAD_LINK),
+        'afterclass_later': ("📝 **Class Finished**\n\n"
+                             "📚 **{class_name}** ({class_code}) ended {minutes} minutes ago.\n\n"
+                             "Have you uploaded your notes yet? 🧠\n\n"
+                             + UPLOAD_LINK),
+    },
+}
+
+
+def _fields(cls: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        'class_name': cls.get('class_name', ''),
+        'class_code': cls.get('class_code', ''),
+        'start': display_time(cls['start_time']),
+        'end': display_time(cls['end_time']),
+        'location': cls.get('location', ''),
+    }
+
+
+def render_morning(index: ScheduleIndex, weekday: int, locale: str = DEFAULT_LOCALE) -> str:
+    text = TEMPLATES[locale]
+    blocks = index.merged_on_weekday(weekday)
+    if not blocks:
+        return text['morning_empty']
+    parts = [text['morning_header']]
+    parts.extend(text['class_block'].format(**_fields(cls)) for _, _, cls in blocks)
+    parts.append(text['morning_footer'])
+    return ''.join(parts)
+
+
+def render_evening(index: ScheduleIndex, weekday: int, locale: str = DEFAULT_LOCALE, active: bool = True) -> str:
+    """Evening summary listing the classes of weekday (the day after it is sent); none if that day is a holiday"""
+    text = TEMPLATES[locale]
+    blocks = index.merged_on_weekday(weekday) if active else []
+    parts = [text['evening_header']]
+    if blocks:
+        parts.append(text['evening_classes'])
+        parts.extend(text['class_block'].format(**_fields(cls)) for _, _, cls in blocks)
+    else:
+        parts.append(text['evening_empty'])
+    parts.append(text['evening_footer'])
+    return ''.join(parts)
+
+
+def class_template(kind: str, minutes: Optional[int]) -> str:
+    """Template name for a class reminder; minutes is None for classes with a single offset"""
+    if minutes is None:
+        return kind
+    if kind == PRECLASS:
+        return 'preclass_now' if minutes == 0 else 'preclass_in'
+    return 'afterclass' if minutes <= JUST_ENDED_MINUTES else 'afterclass_later'
+
+
+def render_class(kind: str, cls: Dict[str, Any], locale: str = DEFAULT_LOCALE,
+                 minutes: Optional[int] = None) -> str:
+    """kind is 'preclass' or 'afterclass'"""
+    return TEMPLATES[locale][class_template(kind, minutes)].format(minutes=minutes, **_fields(cls))
+
+
+class DigestCache:
+    """LRU of rendered texts; day digests are checked against the index's weekday version"""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: 'OrderedDict[Hashable, Tuple[int, str]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Hashable, version: int) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def _store(self, key: Hashable, version: int, message: str) -> str:
+        self._entries[key] = (version, message)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return message
+
+    def morning(self, user_key: Hashable, index: ScheduleIndex, weekday: int,
+                locale: str = DEFAULT_LOCALE) -> str:
+        key = (user_key, 'morning', weekday, locale)
+        version = index.versions[weekday]
+        message = self._lookup(key, version)
+        if message is None:
+            message = self._store(key, version, render_morning(index, weekday, locale))
+        return message
+
+    def evening(self, user_key: Hashable, index: ScheduleIndex, weekday: int,
+                locale: str = DEFAULT_LOCALE, active: bool = True) -> str:
+        """active=False when the academic calendar has no classes tomorrow (break, holiday, term over)"""
+        if not active:
+            key = ('evening_inactive', locale)  # Same text for everyone
+            message = self._lookup(key, 0)
+            if message is None:
+                message = self._store(key, 0, render_evening(index, weekday, locale, active=False))
+            return message
+        key = (user_key, 'evening', weekday, locale)
+        version = index.versions[weekday]
+        message = self._lookup(key, version)
+        if message is None:
+            message = self._store(key, version, render_evening(index, weekday, locale))
+        return message
+
+    def class_message(self, kind: str, cls: Dict[str, Any], locale: str = DEFAULT_LOCALE,
+                      minutes: Optional[int] = None) -> str:
+        """Keyed by the rendered fields, so classmates share one entry and edits miss naturally"""
+        key = (kind, minutes, locale, cls.get('class_name'), cls.get('class_code'),
+               cls.get('start_time'), cls.get('end_time'), cls.get('location'))
+        message = self._lookup(key, 0)
+        if message is None:
+            message = self._store(key, 0, render_class(kind, cls, locale, minutes))
+        return message
+
+    def warm(self, user_key: Hashable, index: ScheduleIndex, locale: str = DEFAULT_LOCALE):
+        """Render every digest and class reminder of a user's week ahead of the send times"""
+        for weekday in range(len(WEEKDAYS)):
+            self.morning(user_key, index, weekday, locale)
+            self.evening(user_key, index, weekday, locale)
+            self._warm_classes(index, weekday, locale)
+
+    def warm_day(self, user_key: Hashable, index: ScheduleIndex, day: date, locale: str = DEFAULT_LOCALE):
+        """Render only what one local day sends: its morning, its evening (tomorrow's list) and its classes"""
+        self.morning(user_key, index, day.weekday(), locale)
+        self.evening(user_key, index, (day + timedelta(days=1)).weekday(), locale)
+        self._warm_classes(index, day.weekday(), locale)
+
+    def _warm_classes(self, index: ScheduleIndex, weekday: int, locale: str):
+        for _, _, cls in index.on_weekday(weekday):
+            for kind, offsets in (('preclass', before_offsets(cls, None)), ('afterclass', after_offsets(cls))):
+                for minutes in (offsets if len(offsets) > 1 else [None]):
+                    self.class_message(kind, cls, locale, minutes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -4,13 +4,23 @@ import asyncio
 import os
 from datetime import datetime, timedelta, time
 import json
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 import pytz
 import google.generativeai as genai
 import base64
 import requests
 from typing import Dict, List, Any, Optional
 from dotenv import load_dotenv
+from schedule_data import HARDCODED_SCHEDULE
+from schedule_index import ScheduleIndex
+from schedule_sync import ClassChangeFeed
+from discord_outbound import DiscordOutboundQueue
+from async_supabase import AsyncSupabase, DB_TIMEOUT_SECONDS
+from reminder_engine import MORNING, EVENING, local_timestamp, seconds_of_day
+from scheduler_metrics import DELIVERY_METRICS, Scheduled, scheduled_delivery, serve_metrics
+from ai_gateway import AIGateway, AITimeout
+from ai_response_cache import ResponseCache
+from discord_streaming import StreamingReply
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,6 +31,11 @@ DISCORD_CHANNEL_ID = int(os.getenv('DISCORD_CHANNEL_ID', '0'))  # Channel where
 DISCORD_USER_ID = int(os.getenv('DISCORD_USER_ID', '0'))  # Fatoom's Discord user ID
 USER_ID = os.getenv('USER_ID', '797281cf-9397-4fca-b983-300825cde186')  # Database user ID
 
+# Schedule source: "hardcoded" or "database" (USER_ID's rows in the classes table, kept in sync by polling)
+SCHEDULE_SOURCE = os.getenv('SCHEDULE_SOURCE', 'hardcoded')
+SCHEDULE_POLL_SECONDS = int(os.getenv('SCHEDULE_POLL_SECONDS', '60'))
+SCHEDULE_REALTIME = os.getenv('SCHEDULE_REALTIME', '0') == '1'
+
 # Supabase Configuration
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
@@ -36,8 +51,27 @@ intents = discord.Intents.default()
 # intents.message_content = True  # Commented out to test without privileged intents
 bot = commands.Bot(command_prefix='!', intents=intents)
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Scheduled messages go through one queue that batches embeds and paces sends per channel
+discord_queue = DiscordOutboundQueue(bot)
+
+# Weekly schedule compiled once at load time
+SCHEDULE_INDEX = ScheduleIndex(HARDCODED_SCHEDULE)
+
+# Initialize Supabase client; its HTTP timeout frees a pool thread soon after the caller gave up
+supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY,
+                                 options=ClientOptions(postgrest_client_timeout=DB_TIMEOUT_SECONDS))
+
+# Queries run on a bounded thread pool so the gateway loop keeps serving other users meanwhile
+db = AsyncSupabase()
+
+# Class edits are patched into SCHEDULE_INDEX without a restart
+schedule_feed = ClassChangeFeed(supabase, user_id=USER_ID, poll_seconds=SCHEDULE_POLL_SECONDS) if SCHEDULE_SOURCE == 'database' else None
+
+def apply_schedule_changes(rows):
+    """Patch changed classes rows into the schedule index"""
+    for row in rows:
+        SCHEDULE_INDEX.upsert(row)
+        ai_cache.invalidate_user(row.get('user_id') or USER_ID)
 
 # Initialize Gemini AI
 if GEMINI_API_KEY:
@@ -46,25 +80,39 @@ if GEMINI_API_KEY:
 else:
     ai_model = None
 
+# Replies are generated asynchronously, a few at a time (AI_CONCURRENCY), each with a timeout (AI_TIMEOUT_SECONDS)
+ai_gateway = AIGateway(ai_model) if ai_model else None
+
+# Replies to repeated questions; a user's entries are dropped when their classes or notes change
+ai_cache = ResponseCache()
+
+# AI replies still being generated, by the ID of the message that asked; deleting that message cancels the reply
+ai_requests: Dict[int, asyncio.Task] = {}
+
+def render_metrics() -> str:
+    return DELIVERY_METRICS.prometheus() + (ai_gateway.prometheus() if ai_gateway else "") + ai_cache.prometheus()
+
 class TaskTools:
     """Tools that the bot can use to perform tasks"""
     
-    def __init__(self, supabase_client: Client, user_id: str):
+    def __init__(self, supabase_client: Client, user_id: str, database: AsyncSupabase = db):
         self.supabase = supabase_client
         self.user_id = user_id
+        self.db = database
     
     async def set_reminder(self, class_code: str, item: str) -> Dict[str, Any]:
         """Set a reminder for a specific class"""
         try:
             # Fetch the class from Supabase
-            response = self.supabase.from_('classes').select('id').eq('user_id', self.user_id).eq('class_code', class_code).single().execute()
+            response = await self.db.execute(self.supabase.from_('classes').select('id').eq('user_id', self.user_id).eq('class_code', class_code).single())
             class_data = response.data
             
             if class_data:
                 class_id = class_data['id']
                 # Update the bring_items field for the class
-                update_response = self.supabase.from_('classes').update({'bring_items': item}).eq('id', class_id).execute()
+                update_response = await self.db.execute(self.supabase.from_('classes').update({'bring_items': item}).eq('id', class_id))
                 if update_response.data:
+                    ai_cache.invalidate_user(self.user_id)
                     return {"success": True, "message": f"✅ Reminder set for {class_code}: '{item}'"}
                 else:
                     return {"success": False, "message": f"❌ Failed to set reminder for {class_code}."}
@@ -77,156 +125,9 @@ class TaskTools:
     async def get_schedule(self, days_ahead: int = 1) -> Dict[str, Any]:
         """Get upcoming schedule using hardcoded data"""
         try:
-            # Hardcoded schedule data
-            hardcoded_schedule = [
-                {
-                    'id': 1,
-                    'class_code': "1203",
-                    'class_name': "مهارات التعلم والتفكير والبحث",
-                    'location': "Building 02, Floor 2, Wing A, Room 320",
-                    'days_of_week': "Mon",
-                    'start_time': "13:00:00",
-                    'end_time': "14:50:00",
-                    'instructor_name': "امل احمد عبدالله باصويل"
-                },
-                {
-                    'id': 2,
-                    'class_code': "1001",
-                    'class_name': "مهارات اللغة الإنجليزية (1)",
-                    'location': "Building 02, Floor 2, Wing A, Room 302",
-                    'days_of_week': "Sun",
-                    'start_time': "08:00:00",
-                    'end_time': "09:50:00",
-                    'instructor_name': "منيره نامي حمد النامي"
-                },
-                {
-                    'id': 3,
-                    'class_code': "1001",
-                    'class_name': "مهارات اللغة الإنجليزية (1)",
-                    'location': "Building 02, Floor 2, Wing A, Room 316",
-                    'days_of_week': "Wed",
-                    'start_time': "08:00:00",
-                    'end_time': "09:50:00",
-                    'instructor_name': "منيره نامي حمد النامي"
-                },
-                {
-                    'id': 4,
-                    'class_code': "1001",
-                    'class_name': "مهارات اللغة الإنجليزية (1)",
-                    'location': "Building 02, Floor 2, Wing A, Room 318",
-                    'days_of_week': "Thu",
-                    'start_time': "08:00:00",
-                    'end_time': "09:50:00",
-                    'instructor_name': "منيره نامي حمد النامي"
-                },
-                {
-                    'id': 5,
-                    'class_code': "1001",
-                    'class_name': "مهارات اللغة الإنجليزية (1)",
-                    'location': "Building 03, Floor 2, Wing A, Room 415",
-                    'days_of_week': "Tue",
-                    'start_time': "08:00:00",
-                    'end_time': "09:50:00",
-                    'instructor_name': "منيره نامي حمد النامي"
-                },
-                {
-                    'id': 6,
-                    'class_code': "1001",
-                    'class_name': "مهارات اللغة الإنجليزية (1)",
-                    'location': "Building 03, Floor 2, Wing A, Room 424",
-                    'days_of_week': "Mon",
-                    'start_time': "08:00:00",
-                    'end_time': "09:50:00",
-                    'instructor_name': "منيره نامي حمد النامي"
-                },
-                {
-                    'id': 7,
-                    'class_code': "1001",
-                    'class_name': "مهارات اللغة الإنجليزية (1)",
-                    'location': "Building 02, Floor 2, Wing A, Room 316",
-                    'days_of_week': "Wed",
-                    'start_time': "10:00:00",
-                    'end_time': "10:50:00",
-                    'instructor_name': "منيره نامي حمد النامي"
-                },
-                {
-                    'id': 8,
-                    'class_code': "1001",
-                    'class_name': "مهارات اللغة الإنجليزية (1)",
-                    'location': "Building 02, Floor 2, Wing A, Room 318",
-                    'days_of_week': "Thu",
-                    'start_time': "10:00:00",
-                    'end_time': "11:50:00",
-                    'instructor_name': "منيره نامي حمد النامي"
-                },
-                {
-                    'id': 9,
-                    'class_code': "1001",
-                    'class_name': "مهارات اللغة الإنجليزية (1)",
-                    'location': "Building 03, Floor 2, Wing A, Room 424",
-                    'days_of_week': "Mon",
-                    'start_time': "10:00:00",
-                    'end_time': "11:50:00",
-                    'instructor_name': "منيره نامي حمد النامي"
-                },
-                {
-                    'id': 10,
-                    'class_code': "1202",
-                    'class_name': "مهارات الحاسب",
-                    'location': "Building 02, Floor 2, Wing A, Room 306",
-                    'days_of_week': "Tue",
-                    'start_time': "10:00:00",
-                    'end_time': "11:50:00",
-                    'instructor_name': "اروى عبدالله محمد المقرن"
-                },
-                {
-                    'id': 11,
-                    'class_code': "1202",
-                    'class_name': "مهارات الحاسب (عملي)",
-                    'location': "Building 02, Floor 2, Wing A, Room 306",
-                    'days_of_week': "Tue",
-                    'start_time': "13:00:00",
-                    'end_time': "14:50:00",
-                    'instructor_name': "اروى عبدالله محمد المقرن"
-                },
-                {
-                    'id': 12,
-                    'class_code': "1103",
-                    'class_name': "مقدمة في الإحصاء",
-                    'location': "Building 02, Floor 2, Wing A, Room 305",
-                    'days_of_week': "Sun",
-                    'start_time': "10:00:00",
-                    'end_time': "11:50:00",
-                    'instructor_name': "امل منصور فرح العبدلي الفيفي"
-                },
-                {
-                    'id': 13,
-                    'class_code': "1103",
-                    'class_name': "مقدمة في الإحصاء (تمارين)",
-                    'location': "Building 02, Floor 2, Wing A, Room 305",
-                    'days_of_week': "Sun",
-                    'start_time': "13:00:00",
-                    'end_time': "14:50:00",
-                    'instructor_name': "امل منصور فرح العبدلي الفيفي"
-                },
-                {
-                    'id': 14,
-                    'class_code': "—",
-                    'class_name': "اللياقة والثقافة الصحية",
-                    'location': "TBA",
-                    'days_of_week': "Sun",
-                    'start_time': "13:00:00",
-                    'end_time': "14:50:00",
-                    'instructor_name': "تغريد محمد عثمان"
-                }
-            ]
-            
-            # Get today's date and filter classes
+            # Get today's classes from the precompiled schedule index
             today = datetime.now(TIMEZONE)
-            today_weekday = today.strftime('%a')  # Mon, Tue, Wed, etc.
-            
-            # Filter classes for today
-            today_classes = [cls for cls in hardcoded_schedule if cls['days_of_week'] == today_weekday]
+            today_classes = [cls for _, _, cls in SCHEDULE_INDEX.today(today)]
             
             if not today_classes:
                 return {"success": True, "message": "📅 No classes scheduled for today!", "classes": []}
@@ -253,7 +154,7 @@ class TaskTools:
         """Upload a note for a specific class"""
         try:
             # Fetch the class from Supabase
-            response = self.supabase.from_('classes').select('id').eq('user_id', self.user_id).eq('class_code', class_code).single().execute()
+            response = await self.db.execute(self.supabase.from_('classes').select('id').eq('user_id', self.user_id).eq('class_code', class_code).single())
             class_data = response.data
             
             if class_data:
@@ -267,8 +168,9 @@ class TaskTools:
                     'upload_date': datetime.now(TIMEZONE).isoformat()
                 }
                 
-                insert_response = self.supabase.from_('notes_uploads').insert(note_data).execute()
+                insert_response = await self.db.execute(self.supabase.from_('notes_uploads').insert(note_data))
                 if insert_response.data:
+                    ai_cache.invalidate_user(self.user_id)
                     return {"success": True, "message": f"✅ Note uploaded for {class_code}"}
                 else:
                     return {"success": False, "message": f"❌ Failed to upload note for {class_code}."}
@@ -285,14 +187,14 @@ class TaskTools:
             
             if class_code:
                 # Get class ID first
-                class_response = self.supabase.from_('classes').select('id').eq('user_id', self.user_id).eq('class_code', class_code).single().execute()
+                class_response = await self.db.execute(self.supabase.from_('classes').select('id').eq('user_id', self.user_id).eq('class_code', class_code).single())
                 if class_response.data:
                     class_id = class_response.data['id']
                     query = query.eq('class_id', class_id)
                 else:
                     return {"success": False, "message": f"❌ Class {class_code} not found."}
             
-            response = query.execute()
+            response = await self.db.execute(query)
             notes = response.data
             
             if not notes:
@@ -303,6 +205,19 @@ class TaskTools:
         except Exception as e:
             return {"success": False, "message": f"❌ Error getting notes: {str(e)}"}
     
+    async def notes_version(self) -> Optional[str]:
+        """Count and latest upload time of the user's notes, which the web app also writes; None if unreadable"""
+        try:
+            response = await self.db.execute(
+                self.supabase.from_('notes_uploads').select('created_at', count='exact')
+                .eq('user_id', self.user_id).order('created_at', desc=True).limit(1)
+            )
+        except Exception as e:
+            print(f"Error reading notes version: {e}")
+            return None
+        latest = response.data[0].get('created_at') if response.data else ''
+        return f"{response.count}@{latest}"
+    
     async def create_reminder(self, title: str, description: str, remind_date: str, remind_time: str) -> Dict[str, Any]:
         """Create a custom reminder"""
         try:
@@ -318,8 +233,9 @@ class TaskTools:
                 'created_at': datetime.now(TIMEZONE).isoformat()
             }
             
-            insert_response = self.supabase.from_('reminders').insert(reminder_data).execute()
+            insert_response = await self.db.execute(self.supabase.from_('reminders').insert(reminder_data))
             if insert_response.data:
+                ai_cache.invalidate_user(self.user_id)
                 return {"success": True, "message": f"✅ Reminder created: '{title}' for {remind_date} at {remind_time}"}
             else:
                 return {"success": False, "message": "❌ Failed to create reminder."}
@@ -335,180 +251,22 @@ class ScheduleReminderBot:
     async def get_upcoming_classes(self, hours_ahead=2):
         """Get classes starting within the next X hours using hardcoded data"""
         now = datetime.now(TIMEZONE)
-        future_time = now + timedelta(hours=hours_ahead)
-        
-        # Hardcoded schedule data
-        hardcoded_schedule = [
-            {
-                'id': 1,
-                'class_code': "1203",
-                'class_name': "مهارات التعلم والتفكير والبحث",
-                'location': "Building 02, Floor 2, Wing A, Room 320",
-                'days_of_week': "Mon",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل احمد عبدالله باصويل"
-            },
-            {
-                'id': 2,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 302",
-                'days_of_week': "Sun",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 3,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 4,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 5,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 415",
-                'days_of_week': "Tue",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 6,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 7,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "10:00:00",
-                'end_time': "10:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 8,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 9,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 10,
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن"
-            },
-            {
-                'id': 11,
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب (عملي)",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن"
-            },
-            {
-                'id': 12,
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي"
-            },
-            {
-                'id': 13,
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء (تمارين)",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي"
-            },
-            {
-                'id': 14,
-                'class_code': "—",
-                'class_name': "اللياقة والثقافة الصحية",
-                'location': "TBA",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "تغريد محمد عثمان"
-            }
-        ]
         
-        # Get current day of week
-        current_weekday = now.strftime('%a')  # Mon, Tue, Wed, etc.
+        # Binary search today's classes starting between now and the window end
+        now_seconds = now.hour * 3600 + now.minute * 60 + now.second
+        window_end = now_seconds + int(hours_ahead * 3600)
         
         upcoming_classes = []
-        for class_item in hardcoded_schedule:
-            if class_item['days_of_week'] == current_weekday:
-                # Parse start time
-                start_time_str = class_item.get('start_time', '')
-                if start_time_str:
-                    try:
-                        start_time = datetime.strptime(start_time_str, '%H:%M:%S').time()
-                        class_datetime = datetime.combine(now.date(), start_time)
-                        class_datetime = TIMEZONE.localize(class_datetime)
-                        
-                        # Check if class is within the specified hours
-                        if now <= class_datetime <= future_time:
-                            upcoming_classes.append({
-                                'name': class_item.get('class_name', 'Unknown Class'),
-                                'time': f"{class_item['start_time']} - {class_item['end_time']}",
-                                'location': class_item.get('location', 'Unknown Location'),
-                                'code': class_item.get('class_code', ''),
-                                'bring_items': class_item.get('bring_items', ''),
-                                'instructor': class_item.get('instructor_name', '')
-                            })
-                    except ValueError:
-                        print(f"Error parsing time: {start_time_str}")
-                        continue
-                
+        for _, _, class_item in SCHEDULE_INDEX.between(now.weekday(), now_seconds, window_end):
+            upcoming_classes.append({
+                'name': class_item.get('class_name', 'Unknown Class'),
+                'time': f"{class_item['start_time']} - {class_item['end_time']}",
+                'location': class_item.get('location', 'Unknown Location'),
+                'code': class_item.get('class_code', ''),
+                'bring_items': class_item.get('bring_items', ''),
+                'instructor': class_item.get('instructor_name', '')
+            })
+        
         return upcoming_classes
     
     async def get_today_completed_classes(self):
@@ -516,7 +274,7 @@ class ScheduleReminderBot:
         today = datetime.now(TIMEZONE).date()
         
         # Get notes uploaded today
-        response = supabase.table('notes_uploads').select('*, classes(*)').eq('user_id', self.user_id).gte('created_at', today.isoformat()).execute()
+        response = await db.execute(supabase.table('notes_uploads').select('*, classes(*)').eq('user_id', self.user_id).gte('created_at', today.isoformat()))
         
         completed_classes = []
         for note in response.data:
@@ -534,172 +292,28 @@ class ScheduleReminderBot:
     async def get_tomorrow_classes(self):
         """Get classes scheduled for tomorrow using hardcoded data"""
         tomorrow = datetime.now(TIMEZONE) + timedelta(days=1)
-        tomorrow_weekday = tomorrow.strftime('%a')  # Mon, Tue, Wed, etc.
-        
-        # Hardcoded schedule data (same as in get_schedule)
-        hardcoded_schedule = [
-            {
-                'id': 1,
-                'class_code': "1203",
-                'class_name': "مهارات التعلم والتفكير والبحث",
-                'location': "Building 02, Floor 2, Wing A, Room 320",
-                'days_of_week': "Mon",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل احمد عبدالله باصويل"
-            },
-            {
-                'id': 2,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 302",
-                'days_of_week': "Sun",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 3,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 4,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 5,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 415",
-                'days_of_week': "Tue",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 6,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 7,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "10:00:00",
-                'end_time': "10:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 8,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 9,
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'id': 10,
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن"
-            },
-            {
-                'id': 11,
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب (عملي)",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن"
-            },
-            {
-                'id': 12,
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي"
-            },
-            {
-                'id': 13,
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء (تمارين)",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي"
-            },
-            {
-                'id': 14,
-                'class_code': "—",
-                'class_name': "اللياقة والثقافة الصحية",
-                'location': "TBA",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "تغريد محمد عثمان"
-            }
-        ]
         
         # Filter classes for tomorrow
         tomorrow_classes = []
-        for cls in hardcoded_schedule:
-            if cls['days_of_week'] == tomorrow_weekday:
-                tomorrow_classes.append({
-                    'name': cls['class_name'],
-                    'time': f"{cls['start_time']} - {cls['end_time']}",
-                    'location': cls['location'],
-                    'code': cls['class_code'],
-                    'bring_items': cls.get('bring_items', ''),
-                    'instructor': cls.get('instructor_name', '')
-                })
+        for _, _, cls in SCHEDULE_INDEX.on_date(tomorrow.date()):
+            tomorrow_classes.append({
+                'name': cls['class_name'],
+                'time': f"{cls['start_time']} - {cls['end_time']}",
+                'location': cls['location'],
+                'code': cls['class_code'],
+                'bring_items': cls.get('bring_items', ''),
+                'instructor': cls.get('instructor_name', '')
+            })
         
         return tomorrow_classes
     
-    async def get_ai_response_with_tools(self, message: str, user_context: str = "") -> str:
-        """Get AI response with tool usage capability"""
-        if not ai_model:
+    async def get_ai_response_with_tools(self, message: str, user_context: str = "",
+                                         reply: Optional[StreamingReply] = None) -> str:
+        """Get AI response with tool usage capability; with a reply, it is shown as it is generated"""
+        if not ai_gateway:
             return "Sorry, AI features are not available. Please check the Gemini API key configuration."
 
+        text = ""
         try:
             # Create context-aware prompt with available tools
             system_prompt = f"""You are Masar Assistant, Fatoom's personal AI academic companion. You can help with:
@@ -729,13 +343,36 @@ Be helpful, friendly, and academic-focused. When using tools, explain what you'r
 
 User Message: {message}"""
 
-            response = ai_model.generate_content(system_prompt)
-            return response.text
+            # Same question, same day, same schedule and notes: reuse the earlier answer. Notes uploaded
+            # through the web app never reach invalidate_user, so their version is part of the key
+            notes_version = await self.tools.notes_version()
+            cache_key = None
+            if notes_version is not None:
+                context = f"{user_context}|{datetime.now(TIMEZONE).date()}|{SCHEDULE_INDEX.versions}|{notes_version}"
+                cache_key = ai_cache.key(self.user_id, message, context)
+                cached = ai_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            if reply is None:
+                text = await ai_gateway.generate(system_prompt)
+            else:
+                await reply.start()
+                async for chunk in ai_gateway.stream(system_prompt):
+                    text += chunk
+                    await reply.update(text)
+            if cache_key is not None:
+                ai_cache.put(cache_key, text)  # Errors and timeouts return below and are never cached
+            return text
+        except AITimeout as e:
+            print(f"AI Error: {e}")
+            notice = "Sorry, that took too long to answer. Please try again in a moment."
+            return f"{text}\n\n⚠️ {notice}" if text else notice
         except Exception as e:
             print(f"AI Error: {e}")
             return "Sorry, I'm having trouble processing your request right now. Please try again later."
     
-    async def process_task_request(self, message: str) -> str:
+    async def process_task_request(self, message: str, reply: Optional[StreamingReply] = None) -> str:
         """Process a task request and execute appropriate tools"""
         message_lower = message.lower()
         
@@ -822,7 +459,16 @@ User Message: {message}"""
                 return result["message"]
         
         # If no specific task detected, use AI for general response
-        return await self.get_ai_response_with_tools(message)
+        return await self.get_ai_response_with_tools(message, reply=reply)
+    
+    async def deliver(self, embed: discord.Embed):
+        """Queue an embed for the reminder channel, mentioning the user"""
+        try:
+            await discord_queue.send_to_channel(DISCORD_CHANNEL_ID, f"<@{DISCORD_USER_ID}>", embed=embed)
+        except discord.NotFound:
+            print("Discord channel not found!")
+        except discord.DiscordException as e:
+            print(f"Error sending Discord message: {e}")
     
     async def send_morning_reminder(self):
         """Send morning reminder about upcoming classes"""
@@ -831,11 +477,6 @@ User Message: {message}"""
         if not upcoming_classes:
             return
         
-        channel = bot.get_channel(DISCORD_CHANNEL_ID)
-        if not channel:
-            print("Discord channel not found!")
-            return
-        
         embed = discord.Embed(
             title="🌅 Good Morning, Fatoom!",
             description="Here are your upcoming classes:",
@@ -859,18 +500,13 @@ User Message: {message}"""
         
         embed.set_footer(text="Have a great day! 🎓")
         
-        await channel.send(f"<@{DISCORD_USER_ID}>", embed=embed)
+        await self.deliver(embed)
     
     async def send_evening_summary(self):
         """Send evening summary of the day"""
         completed_classes = await self.get_today_completed_classes()
         tomorrow_classes = await self.get_tomorrow_classes()
         
-        channel = bot.get_channel(DISCORD_CHANNEL_ID)
-        if not channel:
-            print("Discord channel not found!")
-            return
-        
         embed = discord.Embed(
             title="🌙 End of Day Summary",
             description="Here's how your day went:",
@@ -922,7 +558,7 @@ User Message: {message}"""
         
         embed.set_footer(text="Sweet dreams! 😴")
         
-        await channel.send(f"<@{DISCORD_USER_ID}>", embed=embed)
+        await self.deliver(embed)
 
 # Initialize the reminder bot
 reminder_bot = ScheduleReminderBot()
@@ -940,6 +576,14 @@ async def on_ready():
     # Start the scheduled tasks
     morning_reminder.start()
     evening_summary.start()
+    await serve_metrics(render_metrics)
+    
+    if schedule_feed and not schedule_feed.watermark:
+        SCHEDULE_INDEX.rebuild(await asyncio.to_thread(schedule_feed.load_initial))
+        print(f"Loaded {len(SCHEDULE_INDEX)} class slots from the database")
+        if SCHEDULE_REALTIME:
+            await schedule_feed.enable_realtime(SUPABASE_URL, SUPABASE_KEY)
+        asyncio.create_task(schedule_feed.run(apply_schedule_changes))
 
 @bot.command(name='remind')
 async def set_reminder(ctx, class_code: str, *, item: str):
@@ -950,11 +594,12 @@ async def set_reminder(ctx, class_code: str, *, item: str):
     
     # Update the bring_items field for the class
     try:
-        response = supabase.table('classes').update({
+        response = await db.execute(supabase.table('classes').update({
             'bring_items': item
-        }).eq('user_id', reminder_bot.user_id).eq('class_code', class_code.upper()).execute()
+        }).eq('user_id', reminder_bot.user_id).eq('class_code', class_code.upper()))
         
         if response.data:
+            ai_cache.invalidate_user(reminder_bot.user_id)
             await ctx.send(f"✅ Reminder set for {class_code}: Don't forget to bring **{item}**!")
         else:
             await ctx.send(f"❌ Class {class_code} not found. Make sure the class code is correct.")
@@ -995,6 +640,27 @@ async def show_schedule(ctx):
     
     await ctx.send(embed=embed)
 
+async def run_abandonable(message_id: int, request) -> Optional[str]:
+    """Await an AI reply; returns None if the asking message was deleted before it finished"""
+    task = asyncio.create_task(request)
+    ai_requests[message_id] = task
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise  # The handler itself is being cancelled
+        print(f"Message {message_id} was deleted; dropped its AI reply")
+        return None
+    finally:
+        ai_requests.pop(message_id, None)
+
+@bot.event
+async def on_raw_message_delete(payload):
+    """Stop generating a reply nobody will read"""
+    task = ai_requests.get(payload.message_id)
+    if task:
+        task.cancel()
+
 @bot.command(name='ask')
 async def ask_ai(ctx, *, question: str):
     """Ask Masar Assistant anything"""
@@ -1008,19 +674,17 @@ async def ask_ai(ctx, *, question: str):
         upcoming_classes = await reminder_bot.get_upcoming_classes(hours_ahead=24)
         context = f"Upcoming classes today: {[c['name'] for c in upcoming_classes]}"
         
-        # Get AI response
-        response = await reminder_bot.get_ai_response_with_tools(question, context)
-        
-        # Send response
-        embed = discord.Embed(
-            title="🤖 Masar Assistant",
-            description=response,
-            color=0x3498db,
-            timestamp=datetime.now(TIMEZONE)
+        # Get AI response, editing a placeholder as it streams in
+        reply = StreamingReply(ctx, "Powered by Gemini AI", tz=TIMEZONE)
+        response = await run_abandonable(
+            ctx.message.id, reminder_bot.get_ai_response_with_tools(question, context, reply)
         )
-        embed.set_footer(text="Powered by Gemini AI")
+        if response is None:
+            await reply.discard()
+            return
         
-        await ctx.send(embed=embed)
+        # Send response
+        await reply.finish(response)
 
 @bot.event
 async def on_message(message):
@@ -1054,28 +718,34 @@ async def on_message(message):
                 upcoming_classes = await reminder_bot.get_upcoming_classes(hours_ahead=24)
                 context = f"Upcoming classes today: {[c['name'] for c in upcoming_classes]}"
                 
-                # Process task request or get AI response
-                response = await reminder_bot.process_task_request(content)
+                # Process task request or get AI response, editing a placeholder as it streams in
+                reply = StreamingReply(message.channel, "Powered by Gemini AI + Task Tools", tz=TIMEZONE)
+                response = await run_abandonable(message.id, reminder_bot.process_task_request(content, reply))
+                if response is None:
+                    await reply.discard()
+                    return
                 
                 # Send response
-                embed = discord.Embed(
-                    title="🤖 Masar Assistant",
-                    description=response,
-                    color=0x3498db,
-                    timestamp=datetime.now(TIMEZONE)
-                )
-                embed.set_footer(text="Powered by Gemini AI + Task Tools")
-                
-                await message.channel.send(embed=embed)
+                await reply.finish(response)
+
+MORNING_AT = time(7, 0)
+EVENING_AT = time(21, 0)
+
+def mark_scheduled(kind: str, at: time):
+    """Time this loop's sends against today's scheduled time in the delivery metrics"""
+    today = datetime.now(TIMEZONE).date()
+    scheduled_delivery.set(Scheduled(kind, local_timestamp(TIMEZONE, today, seconds_of_day(at))))
 
-@tasks.loop(time=time(7, 0, tzinfo=TIMEZONE))  # 7:00 AM
+@tasks.loop(time=MORNING_AT.replace(tzinfo=TIMEZONE))  # 7:00 AM
 async def morning_reminder():
     """Send morning reminder at 7:00 AM"""
+    mark_scheduled(MORNING, MORNING_AT)
     await reminder_bot.send_morning_reminder()
 
-@tasks.loop(time=time(21, 0, tzinfo=TIMEZONE))  # 9:00 PM
+@tasks.loop(time=EVENING_AT.replace(tzinfo=TIMEZONE))  # 9:00 PM
 async def evening_summary():
     """Send evening summary at 9:00 PM"""
+    mark_scheduled(EVENING, EVENING_AT)
     await reminder_bot.send_evening_summary()
 
 @bot.event
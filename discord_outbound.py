@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Discord Outbound
+Packs queued embeds into as few messages as possible and paces sends per channel and overall
+"""
+
+import asyncio
+import os
+import time as _time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import discord
+
+from outbound_queue import TokenBucket
+from scheduler_metrics import DELIVERY_METRICS, Scheduled, scheduled_delivery
+
+# Discord allows 50 requests/second per bot and about 5 messages per 5 seconds per channel
+GLOBAL_RATE = float(os.getenv('DISCORD_GLOBAL_RATE', '45'))
+CHANNEL_RATE = float(os.getenv('DISCORD_CHANNEL_RATE', '1'))
+CHANNEL_BURST = 5
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARACTERS = 6000  # Across every embed of one message
+MAX_CONTENT_LENGTH = 2000
+MAX_RATE_LIMITED_ATTEMPTS = 5
+
+# ('channel', channel_id) or ('user', user_id) for DMs
+Destination = Tuple[str, int]
+
+
+class _Item:
+    __slots__ = ('content', 'embed', 'future', 'attempts', 'scheduled', 'dequeued_at')
+
+    def __init__(self, content: Optional[str], embed: Optional[discord.Embed], future: asyncio.Future):
+        self.content = content
+        self.embed = embed
+        self.future = future
+        self.attempts = 0
+        self.scheduled: Optional[Scheduled] = scheduled_delivery.get()
+        self.dequeued_at = 0.0
+
+
+class DiscordOutboundQueue:
+    """await send_to_channel(...) / send_dm(...) return the message that carried the embed"""
+
+    def __init__(self, client: discord.Client, global_rate: float = GLOBAL_RATE, channel_rate: float = CHANNEL_RATE,
+                 clock: Callable[[], float] = _time.monotonic):
+        self.client = client
+        self.channel_rate = channel_rate
+        self.clock = clock
+        self._global = TokenBucket(global_rate, 1, clock())
+        self._buckets: Dict[Destination, TokenBucket] = {}
+        self._channels: Dict[Destination, discord.abc.Messageable] = {}  # Resolved channels and DM channels
+        self._pending: Dict[Destination, Deque[_Item]] = {}
+        self._workers: Dict[Destination, asyncio.Task] = {}
+        self.messages = 0
+        self.embeds = 0
+        self.rate_limited = 0
+
+    async def send_to_channel(self, channel_id: int, content: Optional[str] = None,
+                              embed: Optional[discord.Embed] = None) -> discord.Message:
+        return await self._enqueue(('channel', channel_id), content, embed)
+
+    async def send_dm(self, user_id: int, content: Optional[str] = None,
+                      embed: Optional[discord.Embed] = None) -> discord.Message:
+        return await self._enqueue(('user', user_id), content, embed)
+
+    def pending(self) -> int:
+        return sum(len(items) for items in self._pending.values())
+
+    async def _enqueue(self, destination: Destination, content: Optional[str],
+                       embed: Optional[discord.Embed]) -> discord.Message:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(destination, deque()).append(_Item(content, embed, future))
+        # One worker per destination, so a slow or rate-limited channel never holds up the others
+        if destination not in self._workers:
+            self._workers[destination] = asyncio.create_task(self._drain(destination))
+        return await future
+
+    async def _resolve(self, destination: Destination) -> discord.abc.Messageable:
+        channel = self._channels.get(destination)
+        if channel is None:
+            kind, target_id = destination
+            if kind == 'user':
+                user = self.client.get_user(target_id) or await self.client.fetch_user(target_id)
+                channel = user.dm_channel or await user.create_dm()
+            else:
+                channel = self.client.get_channel(target_id) or await self.client.fetch_channel(target_id)
+            self._channels[destination] = channel
+        return channel
+
+    async def _acquire(self, bucket: TokenBucket):
+        while True:
+            now = self.clock()
+            wait = bucket.wait_time(now)
+            if wait <= 0:
+                bucket.take(now)
+                return
+            await asyncio.sleep(wait)
+
+    def _bucket(self, destination: Destination) -> TokenBucket:
+        bucket = self._buckets.get(destination)
+        if bucket is None:
+            bucket = self._buckets[destination] = TokenBucket(self.channel_rate, CHANNEL_BURST, self.clock())
+        return bucket
+
+    def _take_batch(self, items: Deque[_Item]) -> List[_Item]:
+        """Leading items that fit one message: up to 10 embeds, 6000 embed characters and 2000 content characters"""
+        batch: List[_Item] = []
+        embeds = characters = 0
+        contents = set()
+        content_length = 0
+        while items:
+            item = items[0]
+            size = len(item.embed) if item.embed else 0
+            extra_content = len(item.content) + 1 if item.content and item.content not in contents else 0
+            if batch and (
+                item.embed and (embeds >= MAX_EMBEDS_PER_MESSAGE or characters + size > MAX_EMBED_CHARACTERS)
+                or content_length + extra_content > MAX_CONTENT_LENGTH
+            ):
+                break
+            items.popleft()
+            item.dequeued_at = _time.time()
+            batch.append(item)
+            if item.embed:
+                embeds += 1
+                characters += size
+            if extra_content:
+                contents.add(item.content)
+                content_length += extra_content
+        return batch
+
+    async def _drain(self, destination: Destination):
+        items = self._pending[destination]
+        try:
+            while items:
+                await self._acquire(self._bucket(destination))
+                await self._acquire(self._global)
+                batch = self._take_batch(items)
+                batch = [item for item in batch if not item.future.done()]  # Callers that gave up
+                if batch:
+                    await self._send(destination, batch, items)
+        finally:
+            del self._workers[destination]
+            if not items:
+                del self._pending[destination]
+
+    async def _send(self, destination: Destination, batch: List[_Item], items: Deque[_Item]):
+        # Repeated mentions (e.g. several digests for the same user) are sent once
+        content = "\n".join(dict.fromkeys(item.content for item in batch if item.content)) or None
+        embeds = [item.embed for item in batch if item.embed]
+        try:
+            channel = await self._resolve(destination)
+            message = await channel.send(content=content, embeds=embeds)
+        except discord.RateLimited as e:
+            # discord.py retries 429s itself; this only surfaces for very long waits
+            self.rate_limited += 1
+            print(f"Discord asked to wait {e.retry_after:.1f}s ({destination[0]} {destination[1]})")
+            now = self.clock()
+            self._bucket(destination).pause(now, now + e.retry_after)
+            for item in reversed(batch):
+                item.attempts += 1
+                if item.attempts >= MAX_RATE_LIMITED_ATTEMPTS:
+                    item.future.set_exception(e)
+                else:
+                    items.appendleft(item)
+            return
+        except Exception as e:
+            if isinstance(e, (discord.NotFound, discord.Forbidden)):
+                self._channels.pop(destination, None)  # Deleted channel or closed DMs; look it up again next time
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        self.messages += 1
+        self.embeds += len(embeds)
+        for item in batch:
+            DELIVERY_METRICS.record('discord', item.scheduled, item.dequeued_at)
+            if not item.future.done():
+                item.future.set_result(message)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Discord Streaming
+Shows a reply while it is being generated: posts a placeholder embed and edits it as text arrives
+"""
+
+import os
+import time as _time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import discord
+
+# Discord allows about 5 edits per 5 seconds per channel; stay a little under that
+EDIT_INTERVAL_SECONDS = float(os.getenv('DISCORD_EDIT_INTERVAL_SECONDS', '1.2'))
+MAX_DESCRIPTION_LENGTH = 4096
+PLACEHOLDER = "💭 Thinking..."
+CURSOR = " ▌"
+
+
+def split_pages(text: str, size: int = MAX_DESCRIPTION_LENGTH) -> List[str]:
+    """Embed-sized pages, broken at the last newline or space where there is one"""
+    pages = []
+    while len(text) > size:
+        cut = max(text.rfind('\n', 0, size), text.rfind(' ', 0, size))
+        if cut <= 0:
+            cut = size
+        pages.append(text[:cut])
+        text = text[cut:].lstrip()
+    pages.append(text)
+    return pages
+
+
+class StreamingReply:
+    """await start(), await update(text so far) any number of times, then await finish(full text)"""
+
+    def __init__(self, destination: discord.abc.Messageable, footer: str, color: int = 0x3498db,
+                 tz=None, edit_interval: float = EDIT_INTERVAL_SECONDS,
+                 clock: Callable[[], float] = _time.monotonic):
+        self.destination = destination
+        self.footer = footer
+        self.color = color
+        self.tz = tz
+        self.edit_interval = edit_interval
+        self.clock = clock
+        self.messages: List[discord.Message] = []
+        self._shown: List[str] = []  # Description currently on each message
+        self._text = ""
+        self._last_edit = 0.0
+        self.edits = 0
+
+    def _embed(self, description: str) -> discord.Embed:
+        embed = discord.Embed(
+            title="🤖 Masar Assistant",
+            description=description,
+            color=self.color,
+            timestamp=datetime.now(self.tz)
+        )
+        embed.set_footer(text=self.footer)
+        return embed
+
+    async def start(self):
+        """Post the placeholder; a reply that is never started is sent whole by finish()"""
+        if not self.messages:
+            self.messages.append(await self.destination.send(embed=self._embed(PLACEHOLDER)))
+            self._shown.append(PLACEHOLDER)
+            self._last_edit = self.clock()
+
+    async def update(self, text: str):
+        """Record the text so far; the messages are edited at most once per edit_interval"""
+        self._text = text
+        if self.messages and self.clock() - self._last_edit >= self.edit_interval:
+            await self._render(text + CURSOR)
+
+    async def finish(self, text: Optional[str] = None) -> List[discord.Message]:
+        """Show the final text, replacing the placeholder (or sending it if streaming never started)"""
+        if text is not None:
+            self._text = text
+        await self._render(self._text or "Sorry, I couldn't come up with a reply.")
+        return self.messages
+
+    async def discard(self):
+        """Remove the placeholder and partial reply, e.g. when the question was deleted"""
+        for message in self.messages:
+            try:
+                await message.delete()
+            except discord.HTTPException:
+                pass
+        self.messages.clear()
+        self._shown.clear()
+
+    async def _render(self, text: str):
+        # Text past one embed's limit continues in further messages; earlier pages stop changing
+        for i, page in enumerate(split_pages(text)):
+            if i < len(self.messages):
+                if self._shown[i] != page:
+                    await self.messages[i].edit(embed=self._embed(page))
+                    self._shown[i] = page
+                    self.edits += 1
+            else:
+                self.messages.append(await self.destination.send(embed=self._embed(page)))
+                self._shown.append(page)
+        self._last_edit = self.clock()
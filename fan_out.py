@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Fan Out
+Sends one message to many chats concurrently, reporting each chat's outcome on its own
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+@dataclass
+class SendResult:
+    chat_id: Any
+    ok: bool
+    error: Optional[str] = None
+
+
+def unique_chats(*chat_ids: Any) -> List[Any]:
+    """Drop empty and repeated chat IDs, keeping the first-seen order"""
+    seen = set()
+    chats = []
+    for chat_id in chat_ids:
+        if chat_id and str(chat_id) not in seen:
+            seen.add(str(chat_id))
+            chats.append(chat_id)
+    return chats
+
+
+def parse_chat_ids(value: Optional[str]) -> List[str]:
+    """Chat IDs from a comma-separated setting"""
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+class FanOut:
+    """Concurrent sends with per-chat results
+
+    The limit is not here: a send can spend seconds waiting in the coalescing window and the send
+    queue, and a slot held through those waits would only serialize them. The send queue bounds
+    the requests actually in flight (TELEGRAM_POOL_SIZE) and paces them in priority order.
+    """
+
+    async def _send_one(self, send: Callable[[Any], Awaitable[None]], chat_id: Any) -> SendResult:
+        try:
+            await send(chat_id)
+            return SendResult(chat_id, True)
+        except Exception as e:
+            return SendResult(chat_id, False, str(e))
+
+    async def send(self, send: Callable[[Any], Awaitable[None]], chat_ids: Iterable[Any]) -> List[SendResult]:
+        """Call send(chat_id) for every chat at once; failures are returned, never raised"""
+        chat_ids = list(chat_ids)
+        if len(chat_ids) == 1:
+            return [await self._send_one(send, chat_ids[0])]  # Most users: no extra task
+        return await asyncio.gather(*(self._send_one(send, chat_id) for chat_id in chat_ids))
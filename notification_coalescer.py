@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Notification Coalescer
+Merges notifications due for the same chat within a short window into one message
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, List, Set, Tuple
+
+from outbound_queue import DEFAULT_PRIORITY
+
+# Reminders due in the same minute fire together; this only has to cover the gap between their sends
+COALESCE_SECONDS = float(os.getenv('COALESCE_SECONDS', '2'))
+# A batch goes out as soon as its chat has been quiet this long, so a lone message is not held for the whole window
+COALESCE_IDLE_SECONDS = float(os.getenv('COALESCE_IDLE_SECONDS', '0.05'))
+MAX_MESSAGE_LENGTH = 4096  # Telegram's limit for one text message
+SEPARATOR = "\n\n"
+
+
+class _Batch:
+    def __init__(self, chat_id, kwargs: Dict[str, Any]):
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.texts: List[str] = []
+        self.futures: List[asyncio.Future] = []
+        self.priority = None
+
+    def add(self, text: str, priority: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.texts.append(text)
+        self.futures.append(future)
+        self.priority = priority if self.priority is None else min(self.priority, priority)
+        return future
+
+    def chunks(self, separator: str, limit: int) -> List[Tuple[str, List[asyncio.Future]]]:
+        """Texts joined in arrival order, split so no message exceeds the limit"""
+        chunks = []
+        text, futures = None, []
+        for part, future in zip(self.texts, self.futures):
+            if text is not None and len(text) + len(separator) + len(part) <= limit:
+                text += separator + part
+                futures.append(future)
+                continue
+            if text is not None:
+                chunks.append((text, futures))
+            text, futures = part, [future]
+        if text is not None:
+            chunks.append((text, futures))
+        return chunks
+
+
+class CoalescingTransport:
+    """Drop-in for the outbox: sends to one chat in quick succession go out as one message
+
+    A batch is sent once its chat has been quiet for idle_seconds, or window_seconds after its first
+    message if sends keep arriving.
+    """
+
+    def __init__(self, transport, window_seconds: float = COALESCE_SECONDS, separator: str = SEPARATOR,
+                 max_length: int = MAX_MESSAGE_LENGTH, idle_seconds: float = COALESCE_IDLE_SECONDS):
+        self.transport = transport
+        self.window_seconds = window_seconds
+        self.idle_seconds = idle_seconds
+        self.separator = separator
+        self.max_length = max_length
+        self._batches: Dict[tuple, _Batch] = {}
+        self._flushes: Set[asyncio.Task] = set()
+        self.received = 0
+        self.sent = 0  # Messages handed to the transport
+        self.merged = 0  # Received messages that went out inside another one
+
+    async def send_message(self, chat_id, text: str, priority: int = DEFAULT_PRIORITY, **kwargs):
+        """Returns once the message, possibly merged with others, was sent"""
+        self.received += 1
+        if self.window_seconds <= 0:
+            self.sent += 1
+            return await self.transport.send_message(chat_id=chat_id, text=text, priority=priority, **kwargs)
+        # Only messages sent with the same options can share one send
+        key = (chat_id, tuple(sorted(kwargs.items())))
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(chat_id, kwargs)
+            task = asyncio.create_task(self._flush_later(key, batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        return await batch.add(text, priority)
+
+    async def _flush_later(self, key: tuple, batch: _Batch):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window_seconds
+        while True:
+            waiting = len(batch.texts)
+            await asyncio.sleep(max(0.0, min(self.idle_seconds, deadline - loop.time())))
+            if len(batch.texts) == waiting or loop.time() >= deadline:
+                break
+        del self._batches[key]
+        for text, futures in batch.chunks(self.separator, self.max_length):
+            self.sent += 1
+            self.merged += len(futures) - 1
+            try:
+                result = await self.transport.send_message(chat_id=batch.chat_id, text=text,
+                                                           priority=batch.priority, **batch.kwargs)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for future in futures:
+                if not future.done():
+                    future.set_result(result)
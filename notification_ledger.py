@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Notification Ledger
+Durable, TTL-bounded record of sent notifications so restarts never send a reminder twice
+"""
+
+import os
+import sqlite3
+import time as _time
+from typing import Optional
+
+DEFAULT_LEDGER_PATH = os.getenv('NOTIFICATION_LEDGER_PATH', 'notification_ledger.db')
+DEFAULT_TTL_SECONDS = 2 * 24 * 3600  # Keys only matter until their day is over
+PURGE_EVERY = 500  # Claims between expiry sweeps
+
+
+class NotificationLedger:
+    """SQLite-backed set of notification keys with per-key expiry"""
+
+    def __init__(self, path: str = DEFAULT_LEDGER_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._claims_since_purge = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS sent_notifications ('
+            'key TEXT PRIMARY KEY, expires_at REAL NOT NULL) WITHOUT ROWID'
+        )
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS sent_notifications_expires_at ON sent_notifications (expires_at)'
+        )
+        self.conn.commit()
+        self.purge()
+
+    def claim(self, key: str, now: Optional[float] = None) -> bool:
+        """Record a key; returns False if it was already claimed and has not expired"""
+        now = _time.time() if now is None else now
+        cursor = self.conn.execute(
+            'INSERT INTO sent_notifications (key, expires_at) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at '
+            'WHERE sent_notifications.expires_at <= ?',
+            (key, now + self.ttl_seconds, now)
+        )
+        self.conn.commit()
+
+        self._claims_since_purge += 1
+        if self._claims_since_purge >= PURGE_EVERY:
+            self.purge(now)
+        return cursor.rowcount == 1
+
+    def release(self, key: str):
+        """Forget a key, e.g. after its send failed, so it can be retried"""
+        self.conn.execute('DELETE FROM sent_notifications WHERE key = ?', (key,))
+        self.conn.commit()
+
+    def seen(self, key: str, now: Optional[float] = None) -> bool:
+        now = _time.time() if now is None else now
+        row = self.conn.execute(
+            'SELECT 1 FROM sent_notifications WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row is not None
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Drop expired keys so the ledger stays bounded"""
+        now = _time.time() if now is None else now
+        cursor = self.conn.execute('DELETE FROM sent_notifications WHERE expires_at <= ?', (now,))
+        self.conn.commit()
+        self._claims_since_purge = 0
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM sent_notifications').fetchone()[0]
+
+    def close(self):
+        self.conn.close()
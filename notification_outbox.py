@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Notification Outbox
+Every notification is written to SQLite before it is sent and removed once delivered;
+failures are retried with exponential backoff and end up dead-lettered
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import random
+import sqlite3
+import time as _time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from outbound_queue import DEFAULT_PRIORITY
+
+DEFAULT_OUTBOX_PATH = os.getenv('NOTIFICATION_OUTBOX_PATH', 'notification_outbox.db')
+FLUSH_INTERVAL_SECONDS = 0.05  # Writes arriving within this window share one transaction
+FLUSH_BATCH_SIZE = 500
+MAX_ATTEMPTS = 6
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+RETRY_POLL_SECONDS = 15
+# A row still pending this long after it was written is assumed lost with a crashed worker
+IN_FLIGHT_LEASE_SECONDS = 300
+
+PENDING = 'pending'
+DEAD = 'dead'
+
+
+def backoff_seconds(attempts: int) -> float:
+    """30s, 60s, 120s, ... capped at an hour, with up to 10% jitter so retries do not line up"""
+    delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * (1 + random.random() * 0.1)
+
+
+class NotificationOutbox:
+    """Drop-in for the send queue: await send_message(...) persists the message, then delivers it"""
+
+    def __init__(self, transport, path: str = DEFAULT_OUTBOX_PATH, max_attempts: int = MAX_ATTEMPTS):
+        self.transport = transport
+        self.path = path
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'id TEXT PRIMARY KEY, chat_id TEXT NOT NULL, text TEXT NOT NULL, priority INTEGER NOT NULL, '
+            'status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, '
+            'created_at REAL NOT NULL, last_error TEXT, options TEXT)'
+        )
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(outbox)')}
+        if 'options' not in columns:  # Outboxes written before send options were kept
+            self.conn.execute('ALTER TABLE outbox ADD COLUMN options TEXT')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)')
+        self.conn.commit()
+
+        self._ids = itertools.count()
+        self._id_prefix = f"{_time.time_ns():x}"
+        self._inserts: List[Tuple] = []
+        self._deletes: List[Tuple[str]] = []
+        self._updates: List[Tuple] = []
+        self._flushed: Optional[asyncio.Future] = None  # Resolved by the next flush
+        self._flush_task: Optional[asyncio.Task] = None
+        self._in_flight: Set[str] = set()
+        self.delivered = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+    def _buffered(self) -> int:
+        return len(self._inserts) + len(self._deletes) + len(self._updates)
+
+    def flush(self):
+        """Write every buffered change in one transaction"""
+        if self._buffered():
+            try:
+                with self.conn:
+                    if self._inserts:
+                        self.conn.executemany(
+                            'INSERT INTO outbox (id, chat_id, text, priority, status, attempts, next_attempt_at, '
+                            'created_at, options) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)', self._inserts
+                        )
+                    if self._updates:
+                        self.conn.executemany(
+                            'UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?',
+                            self._updates
+                        )
+                    if self._deletes:
+                        self.conn.executemany('DELETE FROM outbox WHERE id = ?', self._deletes)
+            except sqlite3.Error as e:
+                # Sending without a durable copy beats not sending at all
+                print(f"Error writing notification outbox, {self._buffered()} changes lost: {e}")
+            self._inserts, self._updates, self._deletes = [], [], []
+        flushed, self._flushed = self._flushed, None
+        if flushed and not flushed.done():
+            flushed.set_result(None)
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+        self.flush()
+
+    def _schedule_flush(self) -> asyncio.Future:
+        if self._flushed is None:
+            self._flushed = asyncio.get_running_loop().create_future()
+        flushed = self._flushed  # flush() below clears self._flushed once it resolves this
+        if self._buffered() >= FLUSH_BATCH_SIZE:
+            self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return flushed
+
+    async def send_message(self, chat_id, text: str, priority: int = DEFAULT_PRIORITY, **kwargs):
+        """Persist, then deliver; a failed delivery stays in the outbox for a later retry
+
+        Extra options (parse_mode, ...) are stored with the message and replayed on retries, so they
+        must be JSON-serializable; anything else raises TypeError before the message is queued.
+        """
+        options = json.dumps(kwargs, sort_keys=True) if kwargs else None
+        now = _time.time()
+        outbox_id = f"{self._id_prefix}-{next(self._ids)}"
+        self._inserts.append((outbox_id, str(chat_id), text, priority, PENDING,
+                              now + IN_FLIGHT_LEASE_SECONDS, now, options))
+        await self._schedule_flush()
+        return await self._deliver(outbox_id, chat_id, text, priority, attempts=0, options=kwargs)
+
+    async def _deliver(self, outbox_id: str, chat_id, text: str, priority: int, attempts: int,
+                       options: Optional[Dict[str, Any]] = None):
+        self._in_flight.add(outbox_id)
+        try:
+            result = await self.transport.send_message(chat_id=chat_id, text=text, priority=priority,
+                                                       **(options or {}))
+        except Exception as e:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                self.dead_lettered += 1
+                print(f"Giving up on message {outbox_id} to {chat_id} after {attempts} attempts: {e}")
+                self._updates.append((DEAD, attempts, 0, str(e), outbox_id))
+            else:
+                self._updates.append((PENDING, attempts, _time.time() + backoff_seconds(attempts), str(e), outbox_id))
+            self._schedule_flush()
+            raise
+        finally:
+            self._in_flight.discard(outbox_id)
+        self.delivered += 1
+        self._deletes.append((outbox_id,))
+        self._schedule_flush()
+        return result
+
+    def due(self, now: Optional[float] = None, limit: int = FLUSH_BATCH_SIZE) -> List[Tuple]:
+        now = _time.time() if now is None else now
+        return self.conn.execute(
+            'SELECT id, chat_id, text, priority, attempts, options FROM outbox '
+            'WHERE status = ? AND next_attempt_at <= ? ORDER BY priority, next_attempt_at LIMIT ?',
+            (PENDING, now, limit)
+        ).fetchall()
+
+    async def _retry(self, row: Tuple):
+        outbox_id, chat_id, text, priority, attempts, options = row
+        try:
+            await self._deliver(outbox_id, chat_id, text, priority, attempts,
+                                json.loads(options) if options else None)
+        except Exception:
+            pass  # Already rescheduled or dead-lettered by _deliver
+
+    async def run(self):
+        """Retry due messages forever, including ones left behind by a previous run"""
+        while True:
+            try:
+                self.flush()
+                rows = [row for row in self.due() if row[0] not in self._in_flight]
+                if rows:
+                    self.retried += len(rows)
+                    print(f"Retrying {len(rows)} undelivered notifications")
+                    await asyncio.gather(*(self._retry(row) for row in rows))
+            except sqlite3.Error as e:
+                print(f"Error reading notification outbox: {e}")
+            await asyncio.sleep(RETRY_POLL_SECONDS)
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            'SELECT id, chat_id, text, attempts, last_error FROM outbox WHERE status = ? ORDER BY created_at LIMIT ?',
+            (DEAD, limit)
+        ).fetchall()
+        return [dict(zip(('id', 'chat_id', 'text', 'attempts', 'last_error'), row)) for row in rows]
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM outbox WHERE status = ?', (PENDING,)).fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Outbound Queue
+Paces Telegram sends under the global and per-chat flood limits, with class reminders ahead of digests
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time as _time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from telegram.error import RetryAfter
+
+from reminder_engine import PRECLASS, AFTERCLASS, MORNING, EVENING
+from scheduler_metrics import DELIVERY_METRICS, Scheduled, scheduled_delivery
+from telegram_transport import POOL_SIZE
+
+# Telegram allows about 30 messages/second overall and 1/second per chat; stay a little under both
+GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '25'))
+PER_CHAT_RATE = float(os.getenv('TELEGRAM_PER_CHAT_RATE', '1'))
+MAX_RETRY_AFTER_ATTEMPTS = 5
+
+# Lower goes first: a pre-class reminder is useless once the class has started, a digest can wait
+PRIORITIES = {PRECLASS: 0, AFTERCLASS: 1, MORNING: 2, EVENING: 2}
+DEFAULT_PRIORITY = 3
+
+
+class TokenBucket:
+    """Refills rate tokens per second up to capacity"""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available; 0 if one is available now"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, now: float, until: float):
+        """Hold the bucket so its next token is not available before until"""
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - (until - now) * self.rate)
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    chat_id: Any = field(compare=False)
+    text: str = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+    scheduled: Optional[Scheduled] = field(default=None, compare=False)
+    dequeued_at: float = field(default=0.0, compare=False)  # Epoch seconds
+
+
+class OutboundQueue:
+    """Drop-in for Bot.send_message: await send_message(...) returns once Telegram accepted the message"""
+
+    def __init__(self, bot, global_rate: float = GLOBAL_RATE, per_chat_rate: float = PER_CHAT_RATE,
+                 clock: Callable[[], float] = _time.monotonic, max_in_flight: int = POOL_SIZE):
+        self.bot = bot
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.clock = clock
+        # Capacity 1 spaces sends evenly instead of bursting a full second's worth at once
+        self._global = TokenBucket(global_rate, 1, clock())
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._ready: List[_Job] = []  # Heap by (priority, seq)
+        self._waiting: List[tuple] = []  # Heap of (ready_at, seq, job) held back by their chat's bucket
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._inflight: set = set()
+        # Requests beyond the connection pool would only wait for a connection and hit the pool timeout
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._worker: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.retry_afters = 0
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate, 1, self.clock())
+        return bucket
+
+    def _push(self, job: _Job):
+        heapq.heappush(self._ready, job)
+        self._wakeup.set()
+
+    async def send_message(self, chat_id, text: str, priority: int = DEFAULT_PRIORITY, **kwargs):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._push(_Job(priority, next(self._seq), chat_id, text, kwargs, future,
+                        scheduled=scheduled_delivery.get()))
+        return await future
+
+    def pending(self) -> int:
+        return len(self._ready) + len(self._waiting)
+
+    async def _run(self):
+        while True:
+            now = self.clock()
+            while self._waiting and self._waiting[0][0] <= now:
+                heapq.heappush(self._ready, heapq.heappop(self._waiting)[2])
+
+            if not self._ready:
+                delay = self._waiting[0][0] - now if self._waiting else None
+                await self._sleep(delay)
+                continue
+
+            job = self._ready[0]
+            if job.future.done():
+                heapq.heappop(self._ready)  # Caller gave up
+                continue
+            chat_wait = self._chat_bucket(job.chat_id).wait_time(now)
+            if chat_wait > 0:
+                # This chat is at its limit; let lower-priority jobs for other chats go meanwhile
+                heapq.heappop(self._ready)
+                heapq.heappush(self._waiting, (now + chat_wait, job.seq, job))
+                continue
+
+            global_wait = self._global.wait_time(now)
+            if global_wait > 0:
+                await self._sleep(global_wait)
+                continue
+
+            if self._slots.locked():
+                # Every connection is busy; choose the job again once one frees up, so a more urgent
+                # reminder queued meanwhile still goes first
+                await self._slots.acquire()
+                self._slots.release()
+                continue
+
+            await self._slots.acquire()  # Free right now; released when the request finishes
+            heapq.heappop(self._ready)
+            job.dequeued_at = _time.time()
+            self._global.take(now)
+            self._chat_bucket(job.chat_id).take(now)
+            task = asyncio.create_task(self._send(job))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _sleep(self, delay: Optional[float]):
+        """Wait for delay seconds, or until a new job is queued"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _send(self, job: _Job):
+        try:
+            await self._attempt(job)
+        finally:
+            self._slots.release()
+
+    async def _attempt(self, job: _Job):
+        try:
+            result = await self.bot.send_message(chat_id=job.chat_id, text=job.text, **job.kwargs)
+        except RetryAfter as e:
+            self.retry_afters += 1
+            job.attempts += 1
+            delay = e.retry_after
+            if isinstance(delay, timedelta):
+                delay = delay.total_seconds()
+            print(f"Telegram asked to wait {delay}s (chat {job.chat_id}); pausing all sends")
+            now = self.clock()
+            self._global.pause(now, now + delay)
+            self._chat_bucket(job.chat_id).pause(now, now + delay)
+            if job.attempts >= MAX_RETRY_AFTER_ATTEMPTS:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self._push(job)
+            return
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        self.sent += 1
+        DELIVERY_METRICS.record('telegram', job.scheduled, job.dequeued_at)
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def stop(self):
+        if self._worker:
+            self._worker.cancel()
@@ -1,10 +1,33 @@
 import asyncio
+import json
 import os
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta
 import pytz
-from telegram import Bot
 from telegram.error import TelegramError
 from dotenv import load_dotenv
+from supabase import create_client
+from schedule_data import HARDCODED_SCHEDULE
+from schedule_index import ScheduleIndex
+from digest_messages import DigestCache
+from reminder_engine import (
+    ReminderEngine, ReminderEvent, DailyReminderPlanner, SystemClock, local_timestamp, offset_label,
+    PRECLASS, AFTERCLASS, MORNING, EVENING
+)
+from tenant_scheduler import MultiTenantScheduler, Tenant
+from notification_ledger import NotificationLedger
+from schedule_sync import ClassChangeFeed, reschedule_class
+from shard_leases import ShardCoordinator, SqliteLeaseStore
+from academic_calendar import load_calendar
+from fan_out import FanOut, parse_chat_ids, unique_chats
+from outbound_queue import OutboundQueue, PRIORITIES, DEFAULT_PRIORITY
+from notification_outbox import NotificationOutbox
+from notification_coalescer import CoalescingTransport
+from telegram_transport import build_bot, keep_warm
+from scheduler_simulation import (
+    SEMESTER_DAYS, RecordingTransport, VirtualClock, simulate, summarize, synthetic_tenants
+)
+from scheduler_metrics import serve_metrics
+from delivery_load_test import LOAD_TEST_CHATS, LOAD_TEST_MESSAGES, drive, stub_from_env
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,588 +36,352 @@ load_dotenv()
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 TELEGRAM_FRIEND_CHAT_ID = os.getenv('TELEGRAM_FRIEND_CHAT_ID')  # Your friend's chat ID
+TELEGRAM_EXTRA_CHAT_IDS = parse_chat_ids(os.getenv('TELEGRAM_EXTRA_CHAT_IDS'))  # More friends, comma-separated
+
+# Scheduler mode: "single" serves the hardcoded schedule, "multi" serves every active user in the database,
+# "simulate" replays a semester for synthetic users on a virtual clock and sends nothing,
+# "loadtest" bursts messages through the delivery path against a local Telegram stand-in
+SCHEDULER_MODE = os.getenv('SCHEDULER_MODE', 'single')
+TELEGRAM_USER_CHATS = json.loads(os.getenv('TELEGRAM_USER_CHATS', '{}'))  # {"<user_id>": "<chat_id>"} for users without telegram_chat_id
+
+# Schedule source for single mode: "hardcoded" or "database" (USER_ID's rows in the classes table)
+SCHEDULE_SOURCE = os.getenv('SCHEDULE_SOURCE', 'hardcoded')
+SCHEDULE_POLL_SECONDS = int(os.getenv('SCHEDULE_POLL_SECONDS', '60'))  # How often class edits are picked up
+SCHEDULE_REALTIME = os.getenv('SCHEDULE_REALTIME', '0') == '1'  # Also listen for realtime change notifications
+USER_ID = os.getenv('USER_ID', '797281cf-9397-4fca-b983-300825cde186')  # Database user ID
+
+# Simulation mode: number of synthetic users and simulated days
+SIMULATION_USERS = int(os.getenv('SIMULATION_USERS', '2000'))
+SIMULATION_DAYS = int(os.getenv('SIMULATION_DAYS', str(SEMESTER_DAYS)))
+SIMULATION_RENDER = os.getenv('SIMULATION_RENDER', '0') == '1'  # Also format every message, several times slower
+
+# Sharding (multi-tenant mode): set SHARD_ID on each worker to split users between them
+SHARD_ID = os.getenv('SHARD_ID')
+
+# Supabase Configuration (multi-tenant mode and database schedules)
+SUPABASE_URL = os.getenv('SUPABASE_URL')
+SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+# Term dates and holidays (ACADEMIC_CALENDAR_PATH); without it reminders run every week of the year
+ACADEMIC_CALENDAR = load_calendar()
 
 # Timezone configuration (adjust for your location)
 TIMEZONE = pytz.timezone('Asia/Riyadh')  # Saudi Arabia timezone
 
-# Initialize Telegram bot
-bot = Bot(token=TELEGRAM_BOT_TOKEN)
+# Initialize Telegram bot on a keep-alive connection pool (simulation mode runs without a token)
+bot = build_bot(TELEGRAM_BOT_TOKEN) if TELEGRAM_BOT_TOKEN else None
+
+# Every send is written to the outbox first, then goes through one queue that keeps under Telegram's flood limits
+SEND_QUEUE = OutboundQueue(bot) if bot else None
+OUTBOX = NotificationOutbox(SEND_QUEUE) if bot else None
+
+# Reminders landing together for one chat (e.g. one class's after-class and the next one's preclass) go out as one message
+COALESCER = CoalescingTransport(OUTBOX) if bot else None
+
+# Weekly schedule compiled once at load time
+SCHEDULE_INDEX = ScheduleIndex(HARDCODED_SCHEDULE)
+
+# Reminder texts rendered ahead of the send times
+DIGESTS = DigestCache()
+
+# Sends to every recipient at once; the send queue does the pacing
+FAN_OUT = FanOut()
 
 class TelegramNotifier:
-    def __init__(self):
-        self.chat_id = TELEGRAM_CHAT_ID
-        self.friend_chat_id = TELEGRAM_FRIEND_CHAT_ID
+    def __init__(self, chat_id=TELEGRAM_CHAT_ID, friend_chat_id=TELEGRAM_FRIEND_CHAT_ID,
+                 index=SCHEDULE_INDEX, timezone=TIMEZONE, user_key=None,
+                 transport=None, clock=None, log_sends=True, extra_chat_ids=(), calendar=ACADEMIC_CALENDAR):
+        self.chat_id = chat_id
+        self.friend_chat_id = friend_chat_id
+        self.recipients = unique_chats(chat_id, friend_chat_id, *extra_chat_ids)
+        self.index = index
+        self.timezone = timezone
+        self.user_key = user_key or chat_id  # Digest cache key
+        self.transport = transport or COALESCER  # Anything with an async send_message(chat_id=, text=, priority=)
+        self.clock = clock or SystemClock()
+        self.log_sends = log_sends
+        self.calendar = calendar  # Tomorrow's classes are only listed if it is an active day
+    
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.clock.time(), self.timezone)
         
-    async def send_message(self, message: str, to_friend: bool = False):
+    async def send_message(self, message: str, to_friend: bool = False, kind: str = None):
         """Send a message to Telegram"""
         try:
             target_chat = self.friend_chat_id if to_friend else self.chat_id
             if target_chat:
-                await bot.send_message(chat_id=target_chat, text=message)
-                recipient = "friend" if to_friend else "you"
-                print(f"Message sent to {recipient}: {message}")
+                await self.transport.send_message(chat_id=target_chat, text=message,
+                                                  priority=PRIORITIES.get(kind, DEFAULT_PRIORITY))
+                if self.log_sends:
+                    recipient = "friend" if to_friend else "you"
+                    print(f"Message sent to {recipient}: {message}")
         except TelegramError as e:
             print(f"Error sending message: {e}")
     
-    async def send_message_to_both(self, message: str):
-        """Send a message to both you and your friend"""
-        await self.send_message(message, to_friend=False)  # Send to you
-        if self.friend_chat_id:
-            await self.send_message(message, to_friend=True)  # Send to friend
+    async def send_message_to_all(self, message: str, kind: str = None):
+        """Send a message to you and every friend at once; each recipient succeeds or fails on its own"""
+        priority = PRIORITIES.get(kind, DEFAULT_PRIORITY)
+        
+        async def send(chat_id):
+            await self.transport.send_message(chat_id=chat_id, text=message, priority=priority)
+        
+        results = await FAN_OUT.send(send, self.recipients)
+        for result in results:
+            if not result.ok:
+                print(f"Error sending message to {result.chat_id}: {result.error}")
+        if self.log_sends:
+            sent = sum(result.ok for result in results)
+            print(f"Message sent to {sent}/{len(results)} recipients: {message}")
+        return results
     
     async def send_morning_reminder(self):
         """Send morning reminder about upcoming classes"""
-        # Hardcoded schedule data
-        hardcoded_schedule = [
-            {
-                'class_code': "1203",
-                'class_name': "مهارات التعلم والتفكير والبحث",
-                'location': "Building 02, Floor 2, Wing A, Room 320",
-                'days_of_week': "Mon",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 302",
-                'days_of_week': "Sun",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 415",
-                'days_of_week': "Tue",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "10:00:00",
-                'end_time': "10:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00"
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00"
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب (عملي)",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00"
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00"
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء (تمارين)",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00"
-            },
-            {
-                'class_code': "—",
-                'class_name': "اللياقة والثقافة الصحية",
-                'location': "TBA",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00"
-            }
-        ]
-        
-        # Get today's date and filter classes
-        today = datetime.now(TIMEZONE)
-        today_weekday = today.strftime('%a')  # Mon, Tue, Wed, etc.
-        
-        # Filter classes for today
-        today_classes = [cls for cls in hardcoded_schedule if cls['days_of_week'] == today_weekday]
-        
-        if not today_classes:
-            message = "🌅 Good Morning! 📅 No classes scheduled for today!"
-            await self.send_message(message)
+        # Rendered when the schedule loaded; only re-rendered if today's classes changed since
+        weekday = self.now().weekday()
+        message = DIGESTS.morning(self.user_key, self.index, weekday)
+        if not self.index.merged_on_weekday(weekday):
+            await self.send_message(message, kind=MORNING)
             return
-        
-        # Sort classes by start time
-        today_classes.sort(key=lambda x: x['start_time'])
-        
-        # Combine consecutive classes with same class code
-        combined_classes = []
-        i = 0
-        while i < len(today_classes):
-            current_class = today_classes[i]
-            combined_class = current_class.copy()
-            
-            # Check if next class is the same class code and consecutive
-            while (i + 1 < len(today_classes) and 
-                   today_classes[i + 1]['class_code'] == current_class['class_code'] and
-                   today_classes[i + 1]['start_time'] == current_class['end_time']):
-                # Combine with next class
-                combined_class['end_time'] = today_classes[i + 1]['end_time']
-                i += 1
-            
-            combined_classes.append(combined_class)
-            i += 1
-        
-        # Create morning message
-        message = "🌅 Good Morning! Here are your classes for today:\n\n"
-        
-        for cls in combined_classes:
-            # Convert time to AM/PM format
-            start_time = datetime.strptime(cls['start_time'], '%H:%M:%S').strftime('%I:%M %p')
-            end_time = datetime.strptime(cls['end_time'], '%H:%M:%S').strftime('%I:%M %p')
-            
-            message += f"📚 **{cls['class_name']}** ({cls['class_code']})\n"
-            message += f"⏰ Time: {start_time} - {end_time}\n"
-            message += f"📍 Location: {cls['location']}\n\n"
-        
-        message += "Have a great day! 🎓\n\n"
-        message += "📝 **Upload your notes:** https://YOUR-VERCEL-URL.vercel.app"
-        await self.send_message_to_both(message)
+        await self.send_message_to_all(message, kind=MORNING)
     
     async def send_evening_summary(self):
         """Send evening summary"""
-        tomorrow = datetime.now(TIMEZONE) + timedelta(days=1)
-        tomorrow_weekday = tomorrow.strftime('%a')
-        
-        # Hardcoded schedule data (same as morning)
-        hardcoded_schedule = [
-            {
-                'class_code': "1203",
-                'class_name': "مهارات التعلم والتفكير والبحث",
-                'location': "Building 02, Floor 2, Wing A, Room 320",
-                'days_of_week': "Mon",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 302",
-                'days_of_week': "Sun",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 415",
-                'days_of_week': "Tue",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "10:00:00",
-                'end_time': "10:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00"
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00"
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب (عملي)",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00"
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00"
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء (تمارين)",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00"
-            },
-            {
-                'class_code': "—",
-                'class_name': "اللياقة والثقافة الصحية",
-                'location': "TBA",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00"
-            }
-        ]
-        
-        # Filter classes for tomorrow
-        tomorrow_classes = [cls for cls in hardcoded_schedule if cls['days_of_week'] == tomorrow_weekday]
-        
-        message = "🌙 End of Day Summary\n\n"
-        
-        if tomorrow_classes:
-            # Sort classes by start time
-            tomorrow_classes.sort(key=lambda x: x['start_time'])
-            
-            # Combine consecutive classes with same class code
-            combined_tomorrow_classes = []
-            i = 0
-            while i < len(tomorrow_classes):
-                current_class = tomorrow_classes[i]
-                combined_class = current_class.copy()
-                
-                # Check if next class is the same class code and consecutive
-                while (i + 1 < len(tomorrow_classes) and 
-                       tomorrow_classes[i + 1]['class_code'] == current_class['class_code'] and
-                       tomorrow_classes[i + 1]['start_time'] == current_class['end_time']):
-                    # Combine with next class
-                    combined_class['end_time'] = tomorrow_classes[i + 1]['end_time']
-                    i += 1
-                
-                combined_tomorrow_classes.append(combined_class)
-                i += 1
-            
-            message += "📅 **Tomorrow's Classes:**\n"
-            for cls in combined_tomorrow_classes:
-                # Convert time to AM/PM format
-                start_time = datetime.strptime(cls['start_time'], '%H:%M:%S').strftime('%I:%M %p')
-                end_time = datetime.strptime(cls['end_time'], '%H:%M:%S').strftime('%I:%M %p')
-                
-                message += f"📚 **{cls['class_name']}** ({cls['class_code']})\n"
-                message += f"⏰ Time: {start_time} - {end_time}\n"
-                message += f"📍 Location: {cls['location']}\n\n"
-        else:
-            message += "📅 No classes scheduled for tomorrow!\n\n"
-        
-        message += "Sweet dreams! 😴\n\n"
-        message += "📝 **Upload your notes:** https://YOUR-VERCEL-URL.vercel.app"
-        await self.send_message_to_both(message)
+        tomorrow = self.now().date() + timedelta(days=1)
+        active = self.calendar is None or self.calendar.is_active(tomorrow)
+        message = DIGESTS.evening(self.user_key, self.index, tomorrow.weekday(), active=active)
+        await self.send_message_to_all(message, kind=EVENING)
     
-    async def send_preclass_reminder(self, class_info):
+    async def send_preclass_reminder(self, class_info, minutes=None):
         """Send preclass reminder for a specific class"""
-        start_time = datetime.strptime(class_info['start_time'], '%H:%M:%S').strftime('%I:%M %p')
-        end_time = datetime.strptime(class_info['end_time'], '%H:%M:%S').strftime('%I:%M %p')
-        
-        message = f"🔔 **Class Reminder**\n\n"
-        message += f"📚 **{class_info['class_name']}** ({class_info['class_code']})\n"
-        message += f"⏰ Starts in a few minutes: {start_time} - {end_time}\n"
-        message += f"📍 Location: {class_info['location']}\n\n"
-        message += "Don't forget to bring your materials! 📝"
-        
-        await self.send_message_to_both(message)
+        # Classes with several reminders get a message naming the offset the event was planned for
+        minutes = offset_label(PRECLASS, class_info, minutes)
+        await self.send_message_to_all(DIGESTS.class_message(PRECLASS, class_info, minutes=minutes), kind=PRECLASS)
     
-    async def send_after_class_reminder(self, class_info):
+    async def send_after_class_reminder(self, class_info, minutes=None):
         """Send after class reminder to upload notes"""
-        message = f"📝 **Class Finished**\n\n"
-        message += f"📚 **{class_info['class_name']}** ({class_info['class_code']}) just ended.\n\n"
-        message += "Don't forget to upload your notes while they're fresh in your mind! 🧠\n\n"
-        message += "📝 **Upload your notes:** https://YOUR-VERCEL-URL.vercel.app"
-        
-        await self.send_message_to_both(message)
+        minutes = offset_label(AFTERCLASS, class_info, minutes)
+        await self.send_message_to_all(DIGESTS.class_message(AFTERCLASS, class_info, minutes=minutes), kind=AFTERCLASS)
 
 # Initialize the notifier
-notifier = TelegramNotifier()
+notifier = TelegramNotifier(extra_chat_ids=TELEGRAM_EXTRA_CHAT_IDS)
+
+async def notify(target: TelegramNotifier, kind: str, class_info=None, minutes=None):
+    """Send the notification for one reminder kind"""
+    if kind == PRECLASS:
+        await target.send_preclass_reminder(class_info, minutes)
+    elif kind == AFTERCLASS:
+        await target.send_after_class_reminder(class_info, minutes)
+    elif kind == MORNING:
+        await target.send_morning_reminder()
+    elif kind == EVENING:
+        await target.send_evening_summary()
+
+async def dispatch_reminder(event: ReminderEvent):
+    """Send the notification for a due reminder event"""
+    await notify(notifier, event.kind, event.payload, event.minutes)
+
+# Per-user notifiers for multi-tenant mode, keyed by user ID
+tenant_notifiers = {}
+
+async def deliver_to_tenant(kind: str, tenant: Tenant, class_info=None, minutes=None):
+    """Send one reminder to a user loaded from the database"""
+    if not tenant.chat_id:
+        return
+    target = tenant_notifiers.get(tenant.user_id)
+    if target is None or target.index is not tenant.index:
+        target = TelegramNotifier(chat_id=tenant.chat_id, friend_chat_id=None, index=tenant.index,
+                                  timezone=pytz.timezone(tenant.timezone), user_key=tenant.user_id)
+        tenant_notifiers[tenant.user_id] = target
+    await notify(target, kind, class_info, minutes)
+
+def prepare_tenant_day(tenant: Tenant, day):
+    """Render a user's messages for the day when it is planned, so the 07:00 and 21:00 bursts only look them up"""
+    if tenant.chat_id:
+        DIGESTS.warm_day(tenant.user_id, tenant.index, day)
+
+def start_outbox_retries():
+    """Keep retrying undelivered notifications, including ones left over from before a restart"""
+    if OUTBOX:
+        return asyncio.create_task(OUTBOX.run())
+    return None
+
+def start_prewarming(timezones):
+    """Open Telegram connections a few minutes before each timezone's 07:00 and 21:00 broadcasts"""
+    if bot:
+        return asyncio.create_task(keep_warm(bot, timezones))
+    return None
+
+async def run_multi_tenant():
+    """Serve every active user in the database from this worker"""
+    print("Starting multi-tenant Telegram reminder scheduler...")
+    retries = start_outbox_retries()  # Keep a reference so the task is not garbage collected
+    await serve_metrics()
+    supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    feed = ClassChangeFeed(supabase_client, poll_seconds=SCHEDULE_POLL_SECONDS)
+    if SCHEDULE_REALTIME:
+        await feed.enable_realtime(SUPABASE_URL, SUPABASE_KEY)
+    
+    shard = None
+    # Shared by every shard like the lease store: shards claim "<event>#p<partition>" keys, so they
+    # never collide, and a shard taking over a partition sees what the previous owner already sent
+    ledger = NotificationLedger()
+    if SHARD_ID:
+        print(f"Running as shard {SHARD_ID}")
+        shard = ShardCoordinator(SHARD_ID, SqliteLeaseStore())
+    
+    # The outbound queue paces the actual sends; this limit only bounds how many wait in it
+    scheduler = MultiTenantScheduler(supabase_client, deliver_to_tenant, chat_ids=TELEGRAM_USER_CHATS,
+                                     max_concurrent_sends=1000, ledger=ledger, feed=feed, shard=shard,
+                                     prepare=prepare_tenant_day, calendar=ACADEMIC_CALENDAR)
+    scheduler.load()
+    warmer = start_prewarming(bucket.timezone for bucket in scheduler.buckets.values())
+    try:
+        await scheduler.run()
+    finally:
+        if shard:
+            shard.shutdown()
+
+async def run_simulation():
+    """Replay a semester for synthetic users on a virtual clock, recording sends instead of making them"""
+    print(f"Simulating {SIMULATION_DAYS} days for {SIMULATION_USERS} synthetic users...")
+    start_day = datetime.now(TIMEZONE).date()
+    clock = VirtualClock(local_timestamp(TIMEZONE, start_day, 0))
+    transport = RecordingTransport(clock)
+    notifiers = {}
+    
+    async def deliver(kind: str, tenant: Tenant, class_info=None, minutes=None):
+        target = notifiers.get(tenant.user_id)
+        if target is None:
+            target = TelegramNotifier(chat_id=tenant.chat_id, friend_chat_id=None, index=tenant.index,
+                                      timezone=pytz.timezone(tenant.timezone), user_key=tenant.user_id,
+                                      transport=transport, clock=clock, log_sends=False)
+            notifiers[tenant.user_id] = target
+        await notify(target, kind, class_info, minutes)
+    
+    async def deliver_batch(kind: str, deliveries, minutes=None):
+        if not SIMULATION_RENDER:
+            for tenant, _ in deliveries:
+                transport.record(tenant.chat_id)
+            return
+        # Recording never blocks, so one event's sends run in turn instead of as one task each
+        for tenant, class_info in deliveries:
+            await deliver(kind, tenant, class_info, minutes)
+    
+    # Lateness is always zero on a virtual clock, so the per-engine daily reports are left out, and
+    # nothing is rate limited, so each timezone's digests go out as one event instead of one per second
+    scheduler = MultiTenantScheduler(None, deliver, clock=clock, ledger=NotificationLedger(path=':memory:'),
+                                     prepare=prepare_tenant_day if SIMULATION_RENDER else None,
+                                     calendar=ACADEMIC_CALENDAR, report_daily=False,
+                                     deliver_batch=deliver_batch, broadcast_window_minutes=0)
+    scheduler.use_tenants(synthetic_tenants(SIMULATION_USERS))
+    stats = await simulate(scheduler, clock, transport, start_day, SIMULATION_DAYS, TIMEZONE.zone)
+    print(summarize(stats))
+    if SIMULATION_RENDER:
+        print(f"Digest cache: {len(DIGESTS)} entries, {DIGESTS.hits} hits, {DIGESTS.misses} misses")
+
+async def run_load_test():
+    """Send LOAD_TEST_MESSAGES at once through coalescer, outbox and send queue to a local Telegram stand-in"""
+    print(f"Load testing delivery: {LOAD_TEST_MESSAGES} messages to {LOAD_TEST_CHATS} chats...")
+    stub = stub_from_env()
+    base_url = await stub.start()
+    test_bot = build_bot('123456:load-test', base_url=base_url)
+    queue = OutboundQueue(test_bot)
+    outbox = NotificationOutbox(queue, path=':memory:')
+    transport = CoalescingTransport(outbox)
+    notifiers = [
+        TelegramNotifier(chat_id=str(100000 + n), friend_chat_id=None, user_key=f"load-test-{n}",
+                         transport=transport, log_sends=False)
+        for n in range(max(1, LOAD_TEST_CHATS))
+    ]
+    
+    async def send(n):
+        target = notifiers[n % len(notifiers)]
+        results = await target.send_message_to_all(f"Load test message {n}", kind=PRECLASS)
+        return all(result.ok for result in results)
+    
+    try:
+        result = await drive(send, LOAD_TEST_MESSAGES)
+    finally:
+        queue.stop()
+        outbox.close()
+        await test_bot.shutdown()
+        await stub.close()
+    result.sent, result.merged = transport.sent, transport.merged
+    print(result.report())
+    print(stub.report())
+    print(f"Send queue: {queue.retry_afters} RetryAfter pauses; outbox: {outbox.dead_lettered} dead-lettered")
+
+async def follow_schedule_changes(feed: ClassChangeFeed, engine: ReminderEngine, planner: DailyReminderPlanner):
+    """Keep SCHEDULE_INDEX and today's timers in sync with USER_ID's rows in the classes table"""
+    if SCHEDULE_REALTIME:
+        await feed.enable_realtime(SUPABASE_URL, SUPABASE_KEY)
+    
+    def apply_changes(rows):
+        for row in rows:
+            old_cls = SCHEDULE_INDEX.upsert(row)
+            reschedule_class(engine, planner, old_cls, row)
+        DIGESTS.warm(notifier.user_key, SCHEDULE_INDEX)
+    
+    await feed.run(apply_changes)
 
 async def main():
     """Main function to run scheduled tasks"""
+    if SCHEDULER_MODE == 'multi':
+        await run_multi_tenant()
+        return
+    
+    if SCHEDULER_MODE == 'simulate':
+        await run_simulation()
+        return
+    
+    if SCHEDULER_MODE == 'loadtest':
+        await run_load_test()
+        return
+    
     print("Starting Telegram notification bot on Railway...")
+    retries = start_outbox_retries()  # Keep a reference so the task is not garbage collected
+    warmer = start_prewarming([TIMEZONE])
+    await serve_metrics()
     
-    # Send a startup message to both you and your friend
-    await notifier.send_message_to_both("🤖 Telegram bot is now running on Railway! 24/7 notifications active.")
+    # Send a startup message to you and your friends
+    await notifier.send_message_to_all("🤖 Telegram bot is now running on Railway! 24/7 notifications active.")
     
-    # Track sent notifications to avoid duplicates
-    sent_notifications = set()
+    # Fire reminders from a timer queue instead of polling every minute;
+    # the ledger remembers what was sent across worker restarts
+    engine = ReminderEngine(TIMEZONE, dispatch_reminder, ledger=NotificationLedger(), calendar=ACADEMIC_CALENDAR)
+    planner = DailyReminderPlanner(TIMEZONE, SCHEDULE_INDEX)
+    engine.add_planner(planner)
     
-    # Schedule tasks
-    while True:
-        now = datetime.now(TIMEZONE)
-        current_time = now.time()
-        today_weekday = now.strftime('%a')
-        
-        # Get today's classes
-        hardcoded_schedule = [
-            {
-                'class_code': "1203",
-                'class_name': "مهارات التعلم والتفكير والبحث",
-                'location': "Building 02, Floor 2, Wing A, Room 320",
-                'days_of_week': "Mon",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 302",
-                'days_of_week': "Sun",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 415",
-                'days_of_week': "Tue",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "10:00:00",
-                'end_time': "10:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب (عملي)",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء (تمارين)",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "—",
-                'class_name': "اللياقة والثقافة الصحية",
-                'location': "TBA",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'remind_before_minutes': 15
-            }
-        ]
-        
-        # Filter classes for today
-        today_classes = [cls for cls in hardcoded_schedule if cls['days_of_week'] == today_weekday]
-        
-        # Check for preclass and after class notifications
-        for cls in today_classes:
-            start_time = datetime.strptime(cls['start_time'], '%H:%M:%S').time()
-            end_time = datetime.strptime(cls['end_time'], '%H:%M:%S').time()
-            
-            # Calculate reminder time (X minutes before class starts)
-            reminder_time = (datetime.combine(now.date(), start_time) - timedelta(minutes=cls['remind_before_minutes'])).time()
-            
-            # Check if it's time for preclass reminder
-            if (current_time.hour == reminder_time.hour and 
-                current_time.minute == reminder_time.minute):
-                notification_key = f"preclass_{cls['class_code']}_{cls['start_time']}_{now.date()}"
-                if notification_key not in sent_notifications:
-                    await notifier.send_preclass_reminder(cls)
-                    sent_notifications.add(notification_key)
-            
-            # Check if it's time for after class reminder (5 minutes after class ends)
-            after_class_time = (datetime.combine(now.date(), end_time) + timedelta(minutes=5)).time()
-            if (current_time.hour == after_class_time.hour and 
-                current_time.minute == after_class_time.minute):
-                notification_key = f"afterclass_{cls['class_code']}_{cls['end_time']}_{now.date()}"
-                if notification_key not in sent_notifications:
-                    await notifier.send_after_class_reminder(cls)
-                    sent_notifications.add(notification_key)
-        
-        # Morning reminder at 7:00 AM
-        if current_time.hour == 7 and current_time.minute == 0:
-            await notifier.send_morning_reminder()
-            await asyncio.sleep(60)  # Wait 1 minute to avoid duplicate sends
-        
-        # Evening summary at 9:00 PM
-        elif current_time.hour == 21 and current_time.minute == 0:
-            await notifier.send_evening_summary()
-            await asyncio.sleep(60)  # Wait 1 minute to avoid duplicate sends
-        
-        # Clear old notifications at midnight to reset for new day
-        if current_time.hour == 0 and current_time.minute == 0:
-            sent_notifications.clear()
-        
-        # Check every minute
-        await asyncio.sleep(60)
+    if SCHEDULE_SOURCE == 'database':
+        # Replace the hardcoded schedule before the engine plans today
+        feed = ClassChangeFeed(create_client(SUPABASE_URL, SUPABASE_KEY), user_id=USER_ID,
+                               poll_seconds=SCHEDULE_POLL_SECONDS)
+        SCHEDULE_INDEX.rebuild(feed.load_initial())
+        print(f"Loaded {len(SCHEDULE_INDEX)} class slots from the database")
+    
+    # Render the week's messages now so sends only look them up
+    DIGESTS.warm(notifier.user_key, SCHEDULE_INDEX)
+    
+    if SCHEDULE_SOURCE == 'database':
+        await asyncio.gather(engine.run(), follow_schedule_changes(feed, engine, planner))
+    else:
+        await engine.run()
 
 if __name__ == "__main__":
+    if SCHEDULER_MODE in ('simulate', 'loadtest'):
+        # Nothing reaches Telegram, so no credentials are needed
+        asyncio.run(main())
+        exit(0)
+    
     if not TELEGRAM_BOT_TOKEN:
         print("Error: TELEGRAM_BOT_TOKEN environment variable not set!")
         exit(1)
     
-    if not TELEGRAM_CHAT_ID:
+    if (SCHEDULER_MODE == 'multi' or SCHEDULE_SOURCE == 'database') and (not SUPABASE_URL or not SUPABASE_KEY):
+        print("Error: Supabase credentials not set!")
+        exit(1)
+    
+    if SCHEDULER_MODE != 'multi' and not TELEGRAM_CHAT_ID:
         print("Error: TELEGRAM_CHAT_ID environment variable not set!")
         exit(1)
     
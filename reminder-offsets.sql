@@ -0,0 +1,10 @@
+-- Several reminders per class, e.g. 60/15/0 minutes before the start and 5/60 after the end
+
+-- Minutes before start_time; when empty, remind_before_minutes is used
+ALTER TABLE public.classes ADD COLUMN IF NOT EXISTS remind_offsets_before integer[];
+
+-- Minutes after end_time; when empty, the bot's AFTER_CLASS_MINUTES default is used
+ALTER TABLE public.classes ADD COLUMN IF NOT EXISTS remind_offsets_after integer[];
+
+-- Example: remind an hour ahead, 15 minutes ahead and at the start
+-- UPDATE public.classes SET remind_offsets_before = ARRAY[60, 15, 0], remind_offsets_after = ARRAY[5, 60] WHERE id = 1;
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Reminder Engine
+Priority-queue timer engine that sleeps until the next due reminder
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time as _time
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import date, datetime, timedelta, time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from scheduler_metrics import HistogramFamily, Scheduled, scheduled_delivery
+
+# Event kinds used by the bots
+PRECLASS = 'preclass'
+AFTERCLASS = 'afterclass'
+MORNING = 'morning'
+EVENING = 'evening'
+ROLLOVER = 'rollover'  # Internal: plans the next local day
+
+# Never sleep longer than this in one go, so wall-clock jumps are noticed
+MAX_SLEEP_SECONDS = 300
+
+# Overdue events are still sent if they are at most this late (after a stall or restart)
+CATCHUP_GRACE_SECONDS = int(os.getenv('CATCHUP_GRACE_SECONDS', '900'))
+
+
+def parse_minutes(value) -> List[int]:
+    """Distinct minute offsets, largest first, from an integer[] column or a '60,15,0' string"""
+    if value is None or value == '':
+        return []
+    if isinstance(value, (int, float)):
+        value = [value]
+    elif isinstance(value, str):
+        value = [part for part in value.split(',') if part.strip()]
+    return sorted({int(part) for part in value}, reverse=True)
+
+
+# After-class reminders for classes without their own remind_offsets_after, e.g. "5,60"
+AFTER_CLASS_MINUTES = parse_minutes(os.getenv('AFTER_CLASS_MINUTES', '5'))
+
+
+@dataclass
+class ReminderEvent:
+    fire_at: float  # Epoch seconds
+    kind: str
+    key: str  # Unique per occurrence, e.g. "preclass_1001_08:00:00_2025-09-07"
+    payload: Any = None
+    minutes: Optional[int] = None  # Class reminders: the offset this one was planned for
+
+
+class SystemClock:
+    """Wall clock backed by time.time() and asyncio timers"""
+
+    def time(self) -> float:
+        return _time.time()
+
+    async def sleep_until(self, deadline: float, wakeup: asyncio.Event):
+        """Sleep until the deadline or until the wakeup event is set"""
+        delay = min(max(0.0, deadline - self.time()), MAX_SLEEP_SECONDS)
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+@lru_cache(maxsize=4096)
+def _local_midnight(timezone, day: date) -> Tuple[float, bool]:
+    """Epoch seconds of local midnight, and whether the UTC offset stays the same until the next one"""
+    start = timezone.localize(datetime.combine(day, time()))
+    end = timezone.localize(datetime.combine(day + timedelta(days=1), time()))
+    return start.timestamp(), start.utcoffset() == end.utcoffset()
+
+
+def local_timestamp(timezone, day: date, seconds_of_day: int) -> float:
+    """Epoch seconds for a local wall-clock offset on a given day"""
+    midnight, uniform = _local_midnight(timezone, day)
+    if uniform and 0 <= seconds_of_day < 86400:
+        return midnight + seconds_of_day  # Days without a DST change, i.e. nearly all of them
+    naive = datetime.combine(day, time()) + timedelta(seconds=seconds_of_day)
+    return timezone.localize(naive).timestamp()
+
+
+def seconds_of_day(value: time) -> int:
+    """Seconds since local midnight for a time object"""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def before_offsets(cls, default_before: Optional[int]) -> List[int]:
+    """Minutes before start: remind_offsets_before, else remind_before_minutes, else the default"""
+    offsets = parse_minutes(cls.get('remind_offsets_before'))
+    if offsets:
+        return offsets
+    minutes = cls.get('remind_before_minutes')
+    # 0 means "at the start time", not "unset"
+    return parse_minutes(default_before if minutes is None or minutes == '' else minutes)
+
+
+def after_offsets(cls, default_after: Sequence[int] = AFTER_CLASS_MINUTES) -> List[int]:
+    """Minutes after the end: remind_offsets_after, else the default list"""
+    return parse_minutes(cls.get('remind_offsets_after')) or list(default_after)
+
+
+def class_offsets(cls, start: int, end: int, default_before: int,
+                  default_after: Sequence[int] = AFTER_CLASS_MINUTES) -> List[Tuple[str, int, int]]:
+    """Every reminder of one class occurrence as (kind, minutes, local seconds), expanded once at load"""
+    return (
+        [(PRECLASS, minutes, start - minutes * 60) for minutes in before_offsets(cls, default_before)]
+        + [(AFTERCLASS, minutes, end + minutes * 60) for minutes in after_offsets(cls, default_after)]
+    )
+
+
+def offset_label(kind: str, cls, minutes: Optional[int],
+                 default_after: Sequence[int] = AFTER_CLASS_MINUTES) -> Optional[int]:
+    """The event's offset for the message text; None when the class has only one reminder of this kind"""
+    offsets = before_offsets(cls, None) if kind == PRECLASS else after_offsets(cls, default_after)
+    return minutes if len(offsets) > 1 else None
+
+
+class ReminderEngine:
+    """Fires reminder events at their due time from a min-heap of timers"""
+
+    def __init__(self, timezone, dispatch: Callable[[ReminderEvent], Awaitable[None]], clock=None, ledger=None,
+                 grace_seconds: float = CATCHUP_GRACE_SECONDS, calendar=None, report_daily: bool = True):
+        self.timezone = timezone
+        self.dispatch = dispatch
+        self.clock = clock or SystemClock()
+        self.ledger = ledger  # Optional NotificationLedger shared across restarts
+        self.grace_seconds = grace_seconds
+        self.calendar = calendar  # Optional AcademicCalendar; inactive days get no reminders
+        self.report_daily = report_daily  # Print the lateness report at each rollover
+        self.lateness = HistogramFamily()  # Seconds between due time and dispatch, per kind
+        self.missed = Counter()  # Events dropped for being later than the grace window, per kind
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._pending: Dict[str, int] = {}  # key -> sequence number of its live heap entry
+        self._planners: List[Callable[[date], Iterable[ReminderEvent]]] = []
+        self._inflight: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._running = False
+
+    def add_planner(self, planner: Callable[[date], Iterable[ReminderEvent]]):
+        """Register a function that returns the events of one local day"""
+        self._planners.append(planner)
+
+    def schedule(self, event: ReminderEvent) -> bool:
+        """Queue an event; returns False if the same key is already pending"""
+        if event.key in self._pending:
+            return False
+        seq = next(self._seq)
+        self._pending[event.key] = seq
+        heapq.heappush(self._heap, (event.fire_at, seq, event))
+        # Wake the loop if this event is now the earliest one
+        if self._heap[0][2] is event:
+            self._wakeup.set()
+        return True
+
+    def cancel(self, key: str) -> bool:
+        """Drop a pending event; its heap entry is discarded lazily when it comes due"""
+        return self._pending.pop(key, None) is not None
+
+    def pending(self) -> int:
+        """Number of events waiting to fire"""
+        return len(self._pending)
+
+    def today(self) -> date:
+        return datetime.fromtimestamp(self.clock.time(), self.timezone).date()
+
+    def is_active(self, day: date) -> bool:
+        return self.calendar is None or self.calendar.is_active(day)
+
+    def plan_day(self, day: date):
+        """Schedule every event of a local day that is not past the grace window, plus the next rollover"""
+        if self.is_active(day):
+            earliest = self.clock.time() - self.grace_seconds
+            for planner in self._planners:
+                for event in planner(day):
+                    if event.fire_at >= earliest:
+                        self.schedule(event)
+        # Holidays and breaks are skipped whole: the next rollover lands on the next active day
+        next_day = day + timedelta(days=1)
+        if self.calendar is not None:
+            next_day = self.calendar.next_active(next_day) or next_day
+        self.schedule(ReminderEvent(
+            fire_at=local_timestamp(self.timezone, next_day, 0),
+            kind=ROLLOVER,
+            key=f"{ROLLOVER}_{next_day}",
+            payload=next_day
+        ))
+
+    def _pop_due(self) -> List[ReminderEvent]:
+        now = self.clock.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, event = heapq.heappop(self._heap)
+            if self._pending.get(event.key) != seq:
+                continue  # Cancelled or replaced
+            del self._pending[event.key]
+            due.append(event)
+        return due
+
+    async def _fire(self, event: ReminderEvent):
+        # Skip events a previous run of the worker already sent
+        if self.ledger and not self.ledger.claim(event.key, self.clock.time()):
+            return
+        self.lateness.observe(event.kind, self.clock.time() - event.fire_at)
+        # Sends made for this event are timed against its due time (this task has its own context)
+        scheduled_delivery.set(Scheduled(event.kind, event.fire_at))
+        try:
+            await self.dispatch(event)
+        except Exception as e:
+            print(f"Error firing {event.key}: {e}")
+            if self.ledger:
+                self.ledger.release(event.key)
+
+    def _spawn(self, event: ReminderEvent):
+        # Sends run as their own tasks so a slow send never delays later timers
+        task = asyncio.create_task(self._fire(event))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    def busy(self) -> bool:
+        """True while any dispatched send is still running"""
+        return bool(self._inflight)
+
+    def report(self) -> str:
+        """Lateness histogram and missed counts since the last reset"""
+        lines = self.lateness.summary_lines()
+        if self.missed:
+            lines.append("missed: " + ", ".join(f"{kind}={count}" for kind, count in sorted(self.missed.items())))
+        return "\n".join(lines) or "no reminders fired"
+
+    async def run(self):
+        """Plan today and fire events until stopped"""
+        self._running = True
+        # Start from yesterday so events just before midnight are caught up after a restart;
+        # its rollover is already due and plans today
+        self.plan_day(self.today() - timedelta(days=1))
+        while self._running:
+            # Due events come off the heap oldest first, so a stall is caught up in order
+            now = self.clock.time()
+            for event in self._pop_due():
+                if event.kind == ROLLOVER:
+                    # Histograms survive reset() with zero counts; days with nothing to report stay quiet
+                    if self.report_daily and (self.lateness.count() or sum(self.missed.values())):
+                        print(f"Reminder lateness for the past day:\n{self.report()}")
+                    self.lateness.reset()
+                    self.missed.clear()
+                    self.plan_day(event.payload)
+                elif now - event.fire_at > self.grace_seconds:
+                    self.missed[event.kind] += 1
+                    print(f"Dropping {event.key}: {now - event.fire_at:.0f}s late exceeds the grace window")
+                else:
+                    self._spawn(event)
+            self._wakeup.clear()
+            deadline = self._heap[0][0] if self._heap else self.clock.time() + MAX_SLEEP_SECONDS
+            await self.clock.sleep_until(deadline, self._wakeup)
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+
+
+class DailyReminderPlanner:
+    """Plans the morning/evening digests and per-class reminders of one schedule index"""
+
+    def __init__(self, timezone, index,
+                 morning_at: time = time(7, 0),
+                 evening_at: time = time(21, 0),
+                 after_class_minutes: Sequence[int] = AFTER_CLASS_MINUTES,
+                 default_remind_before: int = 15):
+        self.timezone = timezone
+        self.index = index
+        self.morning_at = morning_at
+        self.evening_at = evening_at
+        self.after_class_minutes = after_class_minutes
+        self.default_remind_before = default_remind_before
+
+    def class_events(self, day: date, start: int, end: int, cls) -> List[ReminderEvent]:
+        events = []
+        for kind, minutes, seconds in class_offsets(cls, start, end, self.default_remind_before,
+                                                     self.after_class_minutes):
+            anchor = cls['start_time'] if kind == PRECLASS else cls['end_time']
+            events.append(ReminderEvent(
+                local_timestamp(self.timezone, day, seconds),
+                kind,
+                f"{kind}_{cls['class_code']}_{anchor}_{minutes}m_{day}",
+                cls,
+                minutes
+            ))
+        return events
+
+    def __call__(self, day: date) -> List[ReminderEvent]:
+        events = [
+            ReminderEvent(local_timestamp(self.timezone, day, seconds_of_day(self.morning_at)), MORNING, f"morning_{day}"),
+            ReminderEvent(local_timestamp(self.timezone, day, seconds_of_day(self.evening_at)), EVENING, f"evening_{day}"),
+        ]
+        for start, end, cls in self.index.on_date(day):
+            events.extend(self.class_events(day, start, end, cls))
+        return events
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Schedule Data
+Hardcoded weekly class schedule shared by the Telegram and Discord bots
+"""
+
+HARDCODED_SCHEDULE = [
+    {
+        'id': 1,
+        'class_code': "1203",
+        'class_name': "مهارات التعلم والتفكير والبحث",
+        'location': "Building 02, Floor 2, Wing A, Room 320",
+        'days_of_week': "Mon",
+        'start_time': "13:00:00",
+        'end_time': "14:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "امل احمد عبدالله باصويل"
+    },
+    {
+        'id': 2,
+        'class_code': "1001",
+        'class_name': "مهارات اللغة الإنجليزية (1)",
+        'location': "Building 02, Floor 2, Wing A, Room 302",
+        'days_of_week': "Sun",
+        'start_time': "08:00:00",
+        'end_time': "09:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "منيره نامي حمد النامي"
+    },
+    {
+        'id': 3,
+        'class_code': "1001",
+        'class_name': "مهارات اللغة الإنجليزية (1)",
+        'location': "Building 02, Floor 2, Wing A, Room 316",
+        'days_of_week': "Wed",
+        'start_time': "08:00:00",
+        'end_time': "09:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "منيره نامي حمد النامي"
+    },
+    {
+        'id': 4,
+        'class_code': "1001",
+        'class_name': "مهارات اللغة الإنجليزية (1)",
+        'location': "Building 02, Floor 2, Wing A, Room 318",
+        'days_of_week': "Thu",
+        'start_time': "08:00:00",
+        'end_time': "09:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "منيره نامي حمد النامي"
+    },
+    {
+        'id': 5,
+        'class_code': "1001",
+        'class_name': "مهارات اللغة الإنجليزية (1)",
+        'location': "Building 03, Floor 2, Wing A, Room 415",
+        'days_of_week': "Tue",
+        'start_time': "08:00:00",
+        'end_time': "09:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "منيره نامي حمد النامي"
+    },
+    {
+        'id': 6,
+        'class_code': "1001",
+        'class_name': "مهارات اللغة الإنجليزية (1)",
+        'location': "Building 03, Floor 2, Wing A, Room 424",
+        'days_of_week': "Mon",
+        'start_time': "08:00:00",
+        'end_time': "09:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "منيره نامي حمد النامي"
+    },
+    {
+        'id': 7,
+        'class_code': "1001",
+        'class_name': "مهارات اللغة الإنجليزية (1)",
+        'location': "Building 02, Floor 2, Wing A, Room 316",
+        'days_of_week': "Wed",
+        'start_time': "10:00:00",
+        'end_time': "10:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "منيره نامي حمد النامي"
+    },
+    {
+        'id': 8,
+        'class_code': "1001",
+        'class_name': "مهارات اللغة الإنجليزية (1)",
+        'location': "Building 02, Floor 2, Wing A, Room 318",
+        'days_of_week': "Thu",
+        'start_time': "10:00:00",
+        'end_time': "11:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "منيره نامي حمد النامي"
+    },
+    {
+        'id': 9,
+        'class_code': "1001",
+        'class_name': "مهارات اللغة الإنجليزية (1)",
+        'location': "Building 03, Floor 2, Wing A, Room 424",
+        'days_of_week': "Mon",
+        'start_time': "10:00:00",
+        'end_time': "11:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "منيره نامي حمد النامي"
+    },
+    {
+        'id': 10,
+        'class_code': "1202",
+        'class_name': "مهارات الحاسب",
+        'location': "Building 02, Floor 2, Wing A, Room 306",
+        'days_of_week': "Tue",
+        'start_time': "10:00:00",
+        'end_time': "11:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "اروى عبدالله محمد المقرن"
+    },
+    {
+        'id': 11,
+        'class_code': "1202",
+        'class_name': "مهارات الحاسب (عملي)",
+        'location': "Building 02, Floor 2, Wing A, Room 306",
+        'days_of_week': "Tue",
+        'start_time': "13:00:00",
+        'end_time': "14:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "اروى عبدالله محمد المقرن"
+    },
+    {
+        'id': 12,
+        'class_code': "1103",
+        'class_name': "مقدمة في الإحصاء",
+        'location': "Building 02, Floor 2, Wing A, Room 305",
+        'days_of_week': "Sun",
+        'start_time': "10:00:00",
+        'end_time': "11:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "امل منصور فرح العبدلي الفيفي"
+    },
+    {
+        'id': 13,
+        'class_code': "1103",
+        'class_name': "مقدمة في الإحصاء (تمارين)",
+        'location': "Building 02, Floor 2, Wing A, Room 305",
+        'days_of_week': "Sun",
+        'start_time': "13:00:00",
+        'end_time': "14:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "امل منصور فرح العبدلي الفيفي"
+    },
+    {
+        'id': 14,
+        'class_code': "—",
+        'class_name': "اللياقة والثقافة الصحية",
+        'location': "TBA",
+        'days_of_week': "Sun",
+        'start_time': "13:00:00",
+        'end_time': "14:50:00",
+        'remind_before_minutes': 15,
+        'instructor_name': "تغريد محمد عثمان"
+    }
+]
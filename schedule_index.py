@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Schedule Index
+Weekly schedule compiled once into per-weekday sorted arrays for binary-search queries
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Index matches date.weekday(): Monday is 0
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+SECONDS_PER_DAY = 24 * 3600
+
+# (start_seconds, end_seconds, class_ref)
+Slot = Tuple[int, int, Dict[str, Any]]
+
+
+def parse_time_seconds(value: str) -> int:
+    """Seconds since midnight for 'HH:MM' or 'HH:MM:SS'"""
+    parts = [int(p) for p in value.split(':')]
+    while len(parts) < 3:
+        parts.append(0)
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+@lru_cache(maxsize=256)
+def display_time(value: str) -> str:
+    """Format a stored 'HH:MM:SS' time as '01:00 PM'"""
+    seconds = parse_time_seconds(value)
+    return time(seconds // 3600, (seconds % 3600) // 60).strftime('%I:%M %p')
+
+
+def parse_days(days_of_week: str) -> List[int]:
+    """Weekday numbers for a days_of_week value such as 'Mon' or 'Mon,Wed,Fri'"""
+    days = []
+    for name in (days_of_week or '').split(','):
+        name = name.strip()[:3].title()
+        if name in WEEKDAYS:
+            days.append(WEEKDAYS.index(name))
+    return days
+
+
+def merge_consecutive(slots: List[Slot]) -> List[Slot]:
+    """Join back-to-back slots of the same class code into one block; slots must be sorted by start"""
+    blocks: List[Slot] = []
+    last_block = {}  # class_code -> position of its latest block
+    for start, end, cls in slots:
+        code = cls.get('class_code')
+        i = last_block.get(code)
+        if i is not None and blocks[i][1] == start:
+            block_start, _, block_cls = blocks[i]
+            merged = dict(block_cls)
+            merged['end_time'] = cls['end_time']
+            blocks[i] = (block_start, end, merged)
+        else:
+            last_block[code] = len(blocks)
+            blocks.append((start, end, cls))
+    return blocks
+
+
+class ScheduleIndex:
+    """Per-weekday sorted arrays of (start_seconds, end_seconds, class_ref)"""
+
+    def __init__(self, classes: Iterable[Dict[str, Any]] = ()):
+        self._starts = [array('l') for _ in WEEKDAYS]
+        self._ends = [array('l') for _ in WEEKDAYS]
+        self._refs: List[List[Dict[str, Any]]] = [[] for _ in WEEKDAYS]
+        self._merged: List[Optional[List[Slot]]] = [None for _ in WEEKDAYS]  # Cached merged blocks
+        self.versions = [0] * len(WEEKDAYS)  # Bumped whenever a weekday's classes change
+        self.rebuild(classes)
+
+    def rebuild(self, classes: Iterable[Dict[str, Any]]):
+        """Replace the whole index with a new set of classes"""
+        buckets: List[List[Slot]] = [[] for _ in WEEKDAYS]
+        for cls in classes:
+            for weekday, slot in self._slots_for(cls):
+                buckets[weekday].append(slot)
+
+        for weekday, slots in enumerate(buckets):
+            slots.sort(key=lambda slot: (slot[0], slot[1]))
+            self._starts[weekday] = array('l', (slot[0] for slot in slots))
+            self._ends[weekday] = array('l', (slot[1] for slot in slots))
+            self._refs[weekday] = [slot[2] for slot in slots]
+            self._changed(weekday)
+
+    def _changed(self, weekday: int):
+        self._merged[weekday] = None
+        self.versions[weekday] += 1
+
+    @staticmethod
+    def _slots_for(cls: Dict[str, Any]) -> List[Tuple[int, Slot]]:
+        if not cls.get('start_time') or not cls.get('end_time'):
+            return []
+        start = parse_time_seconds(cls['start_time'])
+        end = parse_time_seconds(cls['end_time'])
+        return [(weekday, (start, end, cls)) for weekday in parse_days(cls.get('days_of_week'))]
+
+    def upsert(self, cls: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Patch one class row in place; inactive rows are removed. Returns the replaced row"""
+        old = self.remove(cls.get('id'))
+        if cls.get('active', True) is False:
+            return old
+        for weekday, (start, end, ref) in self._slots_for(cls):
+            starts, ends = self._starts[weekday], self._ends[weekday]
+            i = bisect_right(starts, start)
+            while i > 0 and starts[i - 1] == start and ends[i - 1] > end:
+                i -= 1
+            starts.insert(i, start)
+            ends.insert(i, end)
+            self._refs[weekday].insert(i, ref)
+            self._changed(weekday)
+        return old
+
+    def remove(self, class_id) -> Optional[Dict[str, Any]]:
+        """Drop every slot of a class by its id. Returns the removed row"""
+        removed = None
+        if class_id is None:
+            return None
+        for weekday, refs in enumerate(self._refs):
+            for i in reversed(range(len(refs))):
+                if refs[i].get('id') == class_id:
+                    removed = refs[i]
+                    del self._starts[weekday][i]
+                    del self._ends[weekday][i]
+                    del refs[i]
+                    self._changed(weekday)
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(refs) for refs in self._refs)
+
+    def _slots(self, weekday: int, lo: int, hi: int) -> List[Slot]:
+        starts, ends, refs = self._starts[weekday], self._ends[weekday], self._refs[weekday]
+        return [(starts[i], ends[i], refs[i]) for i in range(lo, hi)]
+
+    def on_weekday(self, weekday: int) -> List[Slot]:
+        """All classes of a weekday, ordered by start time"""
+        return self._slots(weekday, 0, len(self._refs[weekday]))
+
+    def on_date(self, day: date) -> List[Slot]:
+        return self.on_weekday(day.weekday())
+
+    def merged_on_weekday(self, weekday: int) -> List[Slot]:
+        """Consecutive same-code classes joined into blocks; cached until this weekday changes"""
+        blocks = self._merged[weekday]
+        if blocks is None:
+            blocks = self._merged[weekday] = merge_consecutive(self.on_weekday(weekday))
+        return blocks
+
+    def merged_on_date(self, day: date) -> List[Slot]:
+        return self.merged_on_weekday(day.weekday())
+
+    def between(self, weekday: int, start_seconds: int, end_seconds: int) -> List[Slot]:
+        """Classes of a weekday starting within [start_seconds, end_seconds]"""
+        starts = self._starts[weekday]
+        lo = bisect_left(starts, start_seconds)
+        hi = bisect_right(starts, end_seconds)
+        return self._slots(weekday, lo, hi)
+
+    def today(self, now: datetime) -> List[Slot]:
+        return self.on_date(now.date())
+
+    def tomorrow(self, now: datetime) -> List[Slot]:
+        return self.on_date(now.date() + timedelta(days=1))
+
+    def upcoming(self, now: datetime, hours: float) -> List[Tuple[date, Slot]]:
+        """Classes starting between now and now + hours, across midnight if needed"""
+        results = []
+        day = now.date()
+        offset = now.hour * 3600 + now.minute * 60 + now.second
+        remaining = int(hours * 3600)
+        while remaining >= 0:
+            window_end = min(offset + remaining, SECONDS_PER_DAY - 1)
+            for slot in self.between(day.weekday(), offset, window_end):
+                results.append((day, slot))
+            remaining -= SECONDS_PER_DAY - offset
+            day += timedelta(days=1)
+            offset = 0
+        return results
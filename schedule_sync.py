@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Schedule Sync
+Incremental reload of the classes table using an updated_at watermark
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from schedule_index import parse_days, parse_time_seconds
+
+DEFAULT_POLL_SECONDS = 60
+PAGE_SIZE = 1000
+# Each poll re-reads this far behind the watermark, so rows whose transaction committed after a
+# newer row was already seen are still picked up; rows already handed out are skipped
+OVERLAP_SECONDS = 30
+
+
+class ClassChangeFeed:
+    """Reads only the classes rows changed since the last poll"""
+
+    def __init__(self, supabase_client, user_id: Optional[str] = None,
+                 poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.supabase = supabase_client
+        self.user_id = user_id
+        self.poll_seconds = poll_seconds
+        self.watermark: Optional[str] = None
+        self._seen: Dict[Any, str] = {}  # id -> updated_at already returned, within the overlap
+        self._wakeup = asyncio.Event()
+        self._removed_ids: List[Any] = []
+        self._realtime_client = None
+
+    def _query(self):
+        query = self.supabase.table('classes').select('*')
+        if self.user_id:
+            query = query.eq('user_id', self.user_id)
+        return query
+
+    def _advance(self, rows: List[Dict[str, Any]]):
+        stamps = [row['updated_at'] for row in rows if row.get('updated_at')]
+        if stamps:
+            latest = max(stamps)
+            if self.watermark is None or latest > self.watermark:
+                self.watermark = latest
+        for row in rows:
+            if row.get('updated_at') and row.get('id') is not None:
+                self._seen[row['id']] = row['updated_at']
+
+    def _overlap_start(self) -> Optional[datetime]:
+        if not self.watermark:
+            return None
+        return datetime.fromisoformat(self.watermark) - timedelta(seconds=OVERLAP_SECONDS)
+
+    def _is_new(self, row: Dict[str, Any]) -> bool:
+        stamp = row.get('updated_at')
+        return not stamp or self._seen.get(row.get('id')) != stamp
+
+    def load_initial(self) -> List[Dict[str, Any]]:
+        """Read every active class once and start the watermark from the newest row"""
+        rows = []
+        start = 0
+        while True:
+            page = self._query().eq('active', True).order('id').range(start, start + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            start += PAGE_SIZE
+        self._advance(rows)
+        if self.watermark is None:
+            self.watermark = datetime.now(dt_timezone.utc).isoformat()
+        return rows
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Rows changed since the last poll, oldest first; inactive rows mean removal"""
+        since = self._overlap_start()
+        rows = []
+        cursor = None  # (updated_at, id) of the last row read; pages never split a timestamp's rows
+        while True:
+            query = self._query().order('updated_at').order('id').limit(PAGE_SIZE)
+            if cursor:
+                stamp, last_id = cursor
+                query = query.or_(f'updated_at.gt."{stamp}",and(updated_at.eq."{stamp}",id.gt."{last_id}")')
+            elif since:
+                query = query.gte('updated_at', since.isoformat())
+            page = query.execute().data or []
+            if page:
+                cursor = (page[-1]['updated_at'], page[-1]['id'])
+            rows.extend(row for row in page if self._is_new(row))
+            if len(page) < PAGE_SIZE:
+                break
+        self._advance(rows)
+        if since:
+            self._seen = {row_id: stamp for row_id, stamp in self._seen.items()
+                          if datetime.fromisoformat(stamp) >= since}
+
+        # Hard deletes are only visible through realtime notifications
+        while self._removed_ids:
+            rows.append({'id': self._removed_ids.pop(), 'active': False})
+        return rows
+
+    def notify(self):
+        """Poll now instead of waiting for the next interval"""
+        self._wakeup.set()
+
+    async def run(self, on_changes: Callable[[List[Dict[str, Any]]], None]):
+        """Poll forever, handing each batch of changed rows to on_changes"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                rows = await asyncio.to_thread(self.poll)
+            except Exception as e:
+                print(f"Error polling class changes: {e}")
+                continue
+            if rows:
+                print(f"Applying {len(rows)} class changes")
+                on_changes(rows)
+
+    def _on_realtime(self, payload: Dict[str, Any]):
+        data = payload.get('data', payload)
+        if data.get('type') == 'DELETE':
+            old_record = data.get('old_record') or {}
+            if old_record.get('id') is not None:
+                self._removed_ids.append(old_record['id'])
+        self.notify()
+
+    async def enable_realtime(self, supabase_url: str, supabase_key: str) -> bool:
+        """Subscribe to classes changes so edits are polled right away; optional"""
+        try:
+            from supabase import acreate_client
+        except ImportError:
+            print("Realtime client not available, using polling only")
+            return False
+        try:
+            self._realtime_client = await acreate_client(supabase_url, supabase_key)
+            channel = self._realtime_client.channel('classes-changes')
+            channel.on_postgres_changes('*', schema='public', table='classes', callback=self._on_realtime)
+            await channel.subscribe()
+            print("Subscribed to realtime class changes")
+            return True
+        except Exception as e:
+            print(f"Realtime subscription failed, using polling only: {e}")
+            return False
+
+
+def reschedule_class(engine, planner, old_cls: Optional[Dict[str, Any]], new_cls: Optional[Dict[str, Any]]):
+    """Swap one class's timers for today on a single-user engine, leaving all others alone"""
+    day = engine.today()
+    if not engine.is_active(day):
+        return
+    for cls, add in ((old_cls, False), (new_cls, True)):
+        if not cls or day.weekday() not in parse_days(cls.get('days_of_week')):
+            continue
+        if add and cls.get('active', True) is False:
+            continue
+        start = parse_time_seconds(cls['start_time'])
+        end = parse_time_seconds(cls['end_time'])
+        for event in planner.class_events(day, start, end, cls):
+            if not add:
+                engine.cancel(event.key)
+            elif event.fire_at >= engine.clock.time():
+                engine.schedule(event)
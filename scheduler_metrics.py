@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Scheduler Metrics
+Fixed-bucket histograms for reminder lateness and delivery timings, exportable in Prometheus text format
+"""
+
+import asyncio
+import os
+import time as _time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Upper bounds in seconds; the final bucket catches everything above the last bound
+DEFAULT_BOUNDS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600)
+# Delivery stages range from tens of milliseconds (one API call) to minutes (a paced broadcast)
+DELIVERY_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+INF_LABEL = 'le="+Inf"'
+
+# A kind such as "preclass", or a tuple of label values such as ("telegram", "preclass")
+Label = Union[str, Tuple[str, ...]]
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # 0 disables the /metrics endpoint
+
+
+class Histogram:
+    """Counts observations into fixed buckets; memory does not grow with traffic"""
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        value = max(0.0, value)
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> str:
+        return (f"n={self.count} mean={self.mean():.2f}s p50<={self.quantile(0.5):g}s "
+                f"p95<={self.quantile(0.95):g}s p99<={self.quantile(0.99):g}s max={self.max:.2f}s")
+
+    def prometheus_lines(self, name: str, labels: Dict[str, str]) -> List[str]:
+        """Cumulative _bucket, _sum and _count samples"""
+        pairs = [f'{key}="{value}"' for key, value in labels.items()]
+
+        def labelled(*extra: str) -> str:
+            return "{" + ",".join(pairs + list(extra)) + "}" if pairs or extra else ""
+
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            cumulative += bucket_count
+            le = f'le="{bound:g}"'
+            lines.append(f"{name}_bucket{labelled(le)} {cumulative}")
+        lines.append(f"{name}_bucket{labelled(INF_LABEL)} {self.count}")
+        lines.append(f"{name}_sum{labelled()} {self.total}")
+        lines.append(f"{name}_count{labelled()} {self.count}")
+        return lines
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class HistogramFamily:
+    """One histogram per label value, e.g. per reminder kind"""
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.histograms: Dict[Label, Histogram] = {}
+
+    def get(self, label: Label) -> Histogram:
+        histogram = self.histograms.get(label)
+        if histogram is None:
+            histogram = self.histograms[label] = Histogram(self.bounds)
+        return histogram
+
+    def observe(self, label: Label, value: float):
+        self.get(label).observe(value)
+
+    def summary_lines(self) -> List[str]:
+        return [f"{label}: {histogram.summary()}" for label, histogram in sorted(self.histograms.items())
+                if histogram.count]
+
+    def count(self) -> int:
+        """Observations across every label since the last reset"""
+        return sum(histogram.count for histogram in self.histograms.values())
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+
+@dataclass
+class Scheduled:
+    """What a send is for and when it was meant to go out (epoch seconds)"""
+    kind: str
+    at: float
+
+
+# Set by whoever fires a scheduled notification; tasks started from there (fan-out, queues) inherit it
+scheduled_delivery: ContextVar[Optional[Scheduled]] = ContextVar('scheduled_delivery', default=None)
+
+
+class DeliveryMetrics:
+    """Scheduled -> dequeued -> acknowledged timings per transport and notification kind"""
+
+    STAGES = (
+        ('queue_wait', 'Seconds from the scheduled time until the message left the send queue'),
+        ('send', 'Seconds from leaving the send queue until the API acknowledged the message'),
+        ('delivery', 'Seconds from the scheduled time until the API acknowledged the message'),
+    )
+
+    def __init__(self, bounds: Sequence[float] = DELIVERY_BOUNDS):
+        self.families: Dict[str, HistogramFamily] = {stage: HistogramFamily(bounds) for stage, _ in self.STAGES}
+
+    def record(self, transport: str, scheduled: Optional[Scheduled], dequeued_at: float,
+               acked_at: Optional[float] = None):
+        """Record one acknowledged send; unscheduled sends (startup messages, retries) are skipped"""
+        if scheduled is None:
+            return
+        acked_at = _time.time() if acked_at is None else acked_at
+        label = (transport, scheduled.kind)
+        self.families['queue_wait'].observe(label, dequeued_at - scheduled.at)
+        self.families['send'].observe(label, acked_at - dequeued_at)
+        self.families['delivery'].observe(label, acked_at - scheduled.at)
+
+    def prometheus(self) -> str:
+        lines = []
+        for stage, help_text in self.STAGES:
+            name = f"notification_{stage}_seconds"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (transport, kind), histogram in sorted(self.families[stage].histograms.items()):
+                lines.extend(histogram.prometheus_lines(name, {'transport': transport, 'kind': kind}))
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every queue in the process
+DELIVERY_METRICS = DeliveryMetrics()
+
+
+async def serve_metrics(render: Callable[[], str] = DELIVERY_METRICS.prometheus, port: int = METRICS_PORT,
+                        host: str = '0.0.0.0') -> Optional[asyncio.AbstractServer]:
+    """Answer every HTTP request with render() as Prometheus text; does nothing when port is 0"""
+    if not port:
+        return None
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # One request per connection; the request itself does not matter
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            body = render().encode('utf-8')
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('ascii') + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Serving delivery metrics on port {port}")
+    return server
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Scheduler Simulation
+Replays weeks of reminders on a virtual clock so scheduler changes can be benchmarked before deploying
+"""
+
+import asyncio
+import random
+import time as _time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import pytz
+
+from reminder_engine import ReminderEvent, local_timestamp
+from schedule_index import WEEKDAYS, ScheduleIndex
+from tenant_scheduler import MultiTenantScheduler, Tenant
+
+SEMESTER_DAYS = 16 * 7
+SIMULATION_TIMEZONES = ('Asia/Riyadh', 'Asia/Dubai', 'Africa/Cairo')
+
+# Class patterns drawn for synthetic users: (class_code, class_name, duration_minutes)
+SYNTHETIC_COURSES = (
+    ('1001', "مهارات اللغة الإنجليزية (1)", 110),
+    ('1103', "مقدمة في الإحصاء", 110),
+    ('1202', "مهارات الحاسب", 110),
+    ('1203', "مهارات التعلم والتفكير والبحث", 110),
+    ('1301', "الثقافة الإسلامية", 50),
+    ('—', "اللياقة والثقافة الصحية", 110),
+)
+SYNTHETIC_START_HOURS = (8, 10, 13, 15)
+
+
+class VirtualClock:
+    """Simulated time for ReminderEngine: sleeping jumps to the next deadline once every engine is idle"""
+
+    def __init__(self, start: float):
+        self.now = start
+        self._sleeping: Dict[asyncio.Event, float] = {}  # wakeup event -> deadline
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep_until(self, deadline: float, wakeup: asyncio.Event):
+        self._sleeping[wakeup] = deadline
+        try:
+            await wakeup.wait()
+        finally:
+            self._sleeping.pop(wakeup, None)
+
+    def sleepers(self) -> int:
+        return len(self._sleeping)
+
+    def advance(self) -> float:
+        """Move to the earliest deadline and wake every engine that is due by then"""
+        target = min(self._sleeping.values())
+        self.now = max(self.now, target)
+        for wakeup, deadline in list(self._sleeping.items()):
+            if deadline <= self.now:
+                wakeup.set()
+        return self.now
+
+    def next_deadline(self) -> Optional[float]:
+        return min(self._sleeping.values()) if self._sleeping else None
+
+
+class RecordingTransport:
+    """Stands in for telegram.Bot: records sends instead of making HTTP calls"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = 0
+        self.characters = 0
+        self.per_chat = Counter()
+        self.last_sent_at: Optional[float] = None
+
+    def record(self, chat_id, text: str = ''):
+        """Count one send without going through a notifier"""
+        self.sent += 1
+        self.characters += len(text)
+        self.per_chat[chat_id] += 1
+        self.last_sent_at = self.clock.time()
+
+    async def send_message(self, chat_id, text: str, **kwargs):
+        self.record(chat_id, text)
+
+
+@dataclass
+class DayStats:
+    day: date
+    events: int
+    sends: int
+    wall_seconds: float
+    cpu_seconds: float
+    peak_rss_mb: float
+
+    def line(self) -> str:
+        rate = self.sends / self.wall_seconds if self.wall_seconds else 0.0
+        return (f"{self.day} ({WEEKDAYS[self.day.weekday()]}): events={self.events} sends={self.sends} "
+                f"wall={self.wall_seconds * 1000:.1f}ms cpu={self.cpu_seconds * 1000:.1f}ms "
+                f"throughput={rate:,.0f} sends/s peak_rss={self.peak_rss_mb:.1f}MB")
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Kilobytes on Linux
+
+
+def synthetic_tenants(count: int, timezones: Sequence[str] = SIMULATION_TIMEZONES,
+                      seed: int = 0) -> Dict[str, Tenant]:
+    """Users with three to six weekly classes each, spread over the given timezones"""
+    rng = random.Random(seed)
+    tenants = {}
+    class_id = 0
+    for n in range(count):
+        user_id = f"sim-user-{n:06d}"
+        classes = []
+        taken = set()
+        for _ in range(rng.randint(3, 6)):
+            code, name, minutes = rng.choice(SYNTHETIC_COURSES)
+            weekday = rng.choice((6, 0, 1, 2, 3))  # Sunday to Thursday
+            hour = rng.choice(SYNTHETIC_START_HOURS)
+            if (weekday, hour) in taken:
+                continue
+            taken.add((weekday, hour))
+            class_id += 1
+            end = hour * 60 + minutes
+            classes.append({
+                'id': class_id,
+                'user_id': user_id,
+                'class_code': code,
+                'class_name': name,
+                'location': f"Building 0{rng.randint(2, 3)}, Room {rng.randint(300, 430)}",
+                'days_of_week': WEEKDAYS[weekday],
+                'start_time': f"{hour:02d}:00:00",
+                'end_time': f"{end // 60:02d}:{end % 60:02d}:00",
+                'remind_before_minutes': rng.choice((15, 30)),
+                'active': True,
+            })
+            if rng.random() < 0.25:
+                classes[-1]['remind_offsets_before'] = [60, 15, 0]
+                classes[-1]['remind_offsets_after'] = [5, 60]
+        tenants[user_id] = Tenant(
+            user_id=user_id,
+            timezone=timezones[n % len(timezones)],
+            chat_id=str(100000 + n),
+            display_name=f"Student {n}",
+            index=ScheduleIndex(classes)
+        )
+    return tenants
+
+
+async def simulate(scheduler: MultiTenantScheduler, clock: VirtualClock, transport: RecordingTransport,
+                   start_day: date, days: int, report_timezone: str = SIMULATION_TIMEZONES[0]) -> List[DayStats]:
+    """Run the scheduler on the virtual clock for a number of local days and collect per-day stats"""
+    tz = pytz.timezone(report_timezone)
+    end_at = local_timestamp(tz, start_day + timedelta(days=days), 0)
+
+    events = 0
+    dispatch = scheduler.dispatch
+
+    async def counting_dispatch(event: ReminderEvent):
+        nonlocal events
+        events += 1
+        await dispatch(event)
+
+    scheduler.dispatch = counting_dispatch
+    runner = asyncio.create_task(scheduler.run())
+
+    stats: List[DayStats] = []
+    day = start_day
+    day_end = local_timestamp(tz, day + timedelta(days=1), 0)
+    day_start = (events, transport.sent, _time.perf_counter(), _time.process_time())
+
+    def close_day():
+        stats.append(DayStats(
+            day=day,
+            events=events - day_start[0],
+            sends=transport.sent - day_start[1],
+            wall_seconds=_time.perf_counter() - day_start[2],
+            cpu_seconds=_time.process_time() - day_start[3],
+            peak_rss_mb=peak_rss_mb(),
+        ))
+        print(stats[-1].line())
+
+    while True:
+        # Let every dispatched send finish before moving time forward
+        await asyncio.sleep(0)
+        engines = list(scheduler.engines.values())
+        if runner.done():
+            runner.result()
+            break
+        if not engines or clock.sleepers() < len(engines) or any(engine.busy() for engine in engines):
+            continue
+
+        next_at = min(clock.next_deadline(), end_at)
+        while next_at >= day_end:
+            close_day()
+            day += timedelta(days=1)
+            day_end = local_timestamp(tz, day + timedelta(days=1), 0)
+            day_start = (events, transport.sent, _time.perf_counter(), _time.process_time())
+        if next_at >= end_at:
+            clock.now = end_at
+            break
+        clock.advance()
+
+    scheduler.stop()
+    await runner
+    return stats
+
+
+def summarize(stats: List[DayStats]) -> str:
+    total_wall = sum(s.wall_seconds for s in stats)
+    total_cpu = sum(s.cpu_seconds for s in stats)
+    sends = sum(s.sends for s in stats)
+    busiest = max(stats, key=lambda s: s.sends) if stats else None
+    lines = [
+        f"Simulated {len(stats)} days: {sum(s.events for s in stats)} events, {sends} sends",
+        f"Wall {total_wall:.2f}s, CPU {total_cpu:.2f}s, {sends / total_wall if total_wall else 0:,.0f} sends/s overall",
+    ]
+    if busiest:
+        lines.append(f"Busiest day {busiest.day}: {busiest.sends} sends in {busiest.wall_seconds * 1000:.1f}ms")
+    if stats:
+        lines.append(f"Peak RSS {max(s.peak_rss_mb for s in stats):.1f}MB")
+    return "\n".join(lines)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Shard Leases
+Splits multi-tenant reminder delivery across worker shards using user-hash partitions and leases
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time as _time
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_LEASE_DB = os.getenv('SHARD_LEASE_DB', 'shard_leases.db')
+DEFAULT_PARTITIONS = int(os.getenv('SHARD_PARTITIONS', '64'))
+DEFAULT_LEASE_SECONDS = int(os.getenv('SHARD_LEASE_SECONDS', '30'))
+RING_REPLICAS = 64  # Virtual nodes per shard on the hash ring
+RELEASED = ''  # Owner of a lease that was handed back; its expires_at is when the shard let go
+
+
+def stable_hash(value: str) -> int:
+    """Hash that is identical in every process (unlike hash())"""
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+@lru_cache(maxsize=65536)
+def partition_for(user_id: str, partitions: int = DEFAULT_PARTITIONS) -> int:
+    return stable_hash(user_id) % partitions
+
+
+class HashRing:
+    """Consistent hash ring: removing a shard only moves the partitions it owned"""
+
+    def __init__(self, nodes: Iterable[str], replicas: int = RING_REPLICAS):
+        points = sorted(
+            (stable_hash(f"{node}#{i}"), node)
+            for node in nodes
+            for i in range(replicas)
+        )
+        self._hashes = [point[0] for point in points]
+        self._nodes = [point[1] for point in points]
+
+    def node_for(self, key: str) -> Optional[str]:
+        if not self._nodes:
+            return None
+        i = bisect_right(self._hashes, stable_hash(key)) % len(self._nodes)
+        return self._nodes[i]
+
+
+class SqliteLeaseStore:
+    """Local stand-in for a shared lease table; a Postgres table with the same columns works the same way"""
+
+    def __init__(self, path: str = DEFAULT_LEASE_DB):
+        self.conn = sqlite3.connect(path, isolation_level=None, timeout=10)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS shard_heartbeats ('
+            'shard_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS partition_leases ('
+            'partition INTEGER PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+
+    def heartbeat(self, shard_id: str, expires_at: float):
+        self.conn.execute(
+            'INSERT INTO shard_heartbeats (shard_id, expires_at) VALUES (?, ?) '
+            'ON CONFLICT(shard_id) DO UPDATE SET expires_at = excluded.expires_at',
+            (shard_id, expires_at)
+        )
+
+    def live_shards(self, now: float) -> List[str]:
+        rows = self.conn.execute(
+            'SELECT shard_id FROM shard_heartbeats WHERE expires_at > ? ORDER BY shard_id', (now,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def lease(self, partition: int) -> Optional[Tuple[str, float]]:
+        """(owner, expires_at) of a partition's lease, or None if it was never taken"""
+        return self.conn.execute(
+            'SELECT owner, expires_at FROM partition_leases WHERE partition = ?', (partition,)
+        ).fetchone()
+
+    def acquire(self, partition: int, shard_id: str, now: float, expires_at: float) -> bool:
+        """Take or renew a lease; fails while another shard's lease is still valid"""
+        cursor = self.conn.execute(
+            'INSERT INTO partition_leases (partition, owner, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(partition) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+            'WHERE partition_leases.owner = excluded.owner OR partition_leases.expires_at <= ?',
+            (partition, shard_id, expires_at, now)
+        )
+        return cursor.rowcount == 1
+
+    def release(self, partition: int, shard_id: str, now: float):
+        """Hand a lease back; the row is kept so the next owner knows when sending stopped"""
+        self.conn.execute(
+            'UPDATE partition_leases SET owner = ?, expires_at = ? WHERE partition = ? AND owner = ?',
+            (RELEASED, now, partition, shard_id)
+        )
+
+    def leave(self, shard_id: str, now: float):
+        self.conn.execute(
+            'UPDATE partition_leases SET owner = ?, expires_at = ? WHERE owner = ?', (RELEASED, now, shard_id)
+        )
+        self.conn.execute('DELETE FROM shard_heartbeats WHERE shard_id = ?', (shard_id,))
+
+
+class ShardCoordinator:
+    """Keeps this shard's partition leases in line with the hash ring of live shards"""
+
+    def __init__(self, shard_id: str, store: SqliteLeaseStore,
+                 partitions: int = DEFAULT_PARTITIONS,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 clock: Callable[[], float] = _time.time):
+        self.shard_id = shard_id
+        self.store = store
+        self.partitions = partitions
+        self.lease_seconds = lease_seconds
+        # Stop sending this long before our lease runs out, so a takeover never overlaps
+        self.safety_margin = lease_seconds / 3
+        self.clock = clock
+        self.owned: Dict[int, float] = {}  # partition -> lease expiry
+
+    def rebalance(self) -> Dict[int, Optional[float]]:
+        """Heartbeat, then claim the partitions the ring assigns to us and drop the rest
+
+        Returns the partitions newly taken, each with the time from which its previous owner may not
+        have sent (None if it never had an owner), so the caller can catch up what fell in between.
+        """
+        now = self.clock()
+        expires_at = now + self.lease_seconds
+        self.store.heartbeat(self.shard_id, expires_at)
+        ring = HashRing(self.store.live_shards(now))
+        wanted: Set[int] = {
+            p for p in range(self.partitions) if ring.node_for(f"partition-{p}") == self.shard_id
+        }
+
+        # Stop sending before giving a partition away
+        for partition in list(self.owned):
+            if partition not in wanted:
+                del self.owned[partition]
+                self.store.release(partition, self.shard_id, now)
+
+        gained: Dict[int, Optional[float]] = {}
+        for partition in wanted:
+            previous = None if partition in self.owned else self.store.lease(partition)
+            if self.store.acquire(partition, self.shard_id, now, expires_at):
+                if partition not in self.owned:
+                    gained[partition] = self._handed_over_at(previous)
+                self.owned[partition] = expires_at
+            else:
+                # Still held by a shard that has not let go or expired yet
+                self.owned.pop(partition, None)
+        return gained
+
+    def _handed_over_at(self, previous: Optional[Tuple[str, float]]) -> Optional[float]:
+        if previous is None:
+            return None
+        owner, expires_at = previous
+        if owner == RELEASED:
+            return expires_at  # Released at that moment, after its last send
+        # The lease lapsed: its owner renewed it last at expires_at - lease_seconds and may have
+        # died any time after; the shared ledger tells which of those sends it had already claimed
+        return expires_at - self.lease_seconds
+
+    def owns_partition(self, partition: int) -> bool:
+        expires_at = self.owned.get(partition)
+        return expires_at is not None and expires_at - self.safety_margin > self.clock()
+
+    def owns_user(self, user_id: str) -> bool:
+        return self.owns_partition(partition_for(user_id, self.partitions))
+
+    async def run(self, on_acquire: Optional[Callable[[Dict[int, Optional[float]]], None]] = None):
+        """Renew leases every third of the lease period; on_acquire(gained) hears about each takeover"""
+        while True:
+            try:
+                before = len(self.owned)
+                gained = self.rebalance()
+                if len(self.owned) != before or gained:
+                    print(f"Shard {self.shard_id} now owns {len(self.owned)}/{self.partitions} partitions")
+                if gained and on_acquire:
+                    on_acquire(gained)
+            except sqlite3.Error as e:
+                print(f"Error renewing shard leases: {e}")
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    def shutdown(self):
+        """Hand every partition back right away instead of waiting for expiry"""
+        self.owned.clear()
+        self.store.leave(self.shard_id, self.clock())
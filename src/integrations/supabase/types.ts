@@ -25,6 +25,8 @@ export type Database = {
           id: number
           location: string | null
           remind_before_minutes: number | null
+          remind_offsets_after: number[] | null
+          remind_offsets_before: number[] | null
           start_time: string | null
           updated_at: string | null
           user_id: string | null
@@ -39,6 +41,8 @@ export type Database = {
           id?: number
           location?: string | null
           remind_before_minutes?: number | null
+          remind_offsets_after?: number[] | null
+          remind_offsets_before?: number[] | null
           start_time?: string | null
           updated_at?: string | null
           user_id?: string | null
@@ -53,6 +57,8 @@ export type Database = {
           id?: number
           location?: string | null
           remind_before_minutes?: number | null
+          remind_offsets_after?: number[] | null
+          remind_offsets_before?: number[] | null
           start_time?: string | null
           updated_at?: string | null
           user_id?: string | null
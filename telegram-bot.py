@@ -1,10 +1,18 @@
 import asyncio
 import os
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta
 import pytz
-from telegram import Bot
 from telegram.error import TelegramError
 from dotenv import load_dotenv
+from schedule_data import HARDCODED_SCHEDULE
+from schedule_index import ScheduleIndex
+from digest_messages import DigestCache
+from academic_calendar import load_calendar
+from telegram_transport import build_bot, keep_warm
+from reminder_engine import (
+    ReminderEngine, ReminderEvent, DailyReminderPlanner, offset_label,
+    PRECLASS, AFTERCLASS, MORNING, EVENING
+)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,12 +24,22 @@ TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')  # Your Telegram chat ID
 # Timezone configuration (adjust for your location)
 TIMEZONE = pytz.timezone('Asia/Riyadh')  # Saudi Arabia timezone
 
-# Initialize Telegram bot
-bot = Bot(token=TELEGRAM_BOT_TOKEN)
+# Initialize Telegram bot on a keep-alive connection pool
+bot = build_bot(TELEGRAM_BOT_TOKEN)
+
+# Term dates and holidays (ACADEMIC_CALENDAR_PATH); without it reminders run every week of the year
+ACADEMIC_CALENDAR = load_calendar()
+
+# Weekly schedule compiled once at load time
+SCHEDULE_INDEX = ScheduleIndex(HARDCODED_SCHEDULE)
+
+# Reminder texts rendered ahead of the send times
+DIGESTS = DigestCache()
 
 class TelegramNotifier:
     def __init__(self):
         self.chat_id = TELEGRAM_CHAT_ID
+        self.user_key = TELEGRAM_CHAT_ID  # Digest cache key
         
     async def send_message(self, message: str):
         """Send a message to Telegram"""
@@ -33,384 +51,26 @@ class TelegramNotifier:
     
     async def send_morning_reminder(self):
         """Send morning reminder about upcoming classes"""
-        # Hardcoded schedule data
-        hardcoded_schedule = [
-            {
-                'class_code': "1203",
-                'class_name': "مهارات التعلم والتفكير والبحث",
-                'location': "Building 02, Floor 2, Wing A, Room 320",
-                'days_of_week': "Mon",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل احمد عبدالله باصويل"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 302",
-                'days_of_week': "Sun",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 415",
-                'days_of_week': "Tue",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "10:00:00",
-                'end_time': "10:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن"
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب (عملي)",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن"
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي"
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء (تمارين)",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي"
-            },
-            {
-                'class_code': "—",
-                'class_name': "اللياقة والثقافة الصحية",
-                'location': "TBA",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "تغريد محمد عثمان"
-            }
-        ]
-        
-        # Get today's date and filter classes
-        today = datetime.now(TIMEZONE)
-        today_weekday = today.strftime('%a')  # Mon, Tue, Wed, etc.
-        
-        # Filter classes for today
-        today_classes = [cls for cls in hardcoded_schedule if cls['days_of_week'] == today_weekday]
-        
-        if not today_classes:
-            message = "🌅 Good Morning! 📅 No classes scheduled for today!"
-            await self.send_message(message)
-            return
-        
-        # Sort classes by start time
-        today_classes.sort(key=lambda x: x['start_time'])
-        
-        # Combine consecutive classes with same class code
-        combined_classes = []
-        i = 0
-        while i < len(today_classes):
-            current_class = today_classes[i]
-            combined_class = current_class.copy()
-            
-            # Check if next class is the same class code and consecutive
-            while (i + 1 < len(today_classes) and 
-                   today_classes[i + 1]['class_code'] == current_class['class_code'] and
-                   today_classes[i + 1]['start_time'] == current_class['end_time']):
-                # Combine with next class
-                combined_class['end_time'] = today_classes[i + 1]['end_time']
-                i += 1
-            
-            combined_classes.append(combined_class)
-            i += 1
-        
-        # Create morning message
-        message = "🌅 Good Morning! Here are your classes for today:\n\n"
-        
-        for cls in combined_classes:
-            # Convert time to AM/PM format
-            start_time = datetime.strptime(cls['start_time'], '%H:%M:%S').strftime('%I:%M %p')
-            end_time = datetime.strptime(cls['end_time'], '%H:%M:%S').strftime('%I:%M %p')
-            
-            message += f"📚 **{cls['class_name']}** ({cls['class_code']})\n"
-            message += f"⏰ Time: {start_time} - {end_time}\n"
-            message += f"📍 Location: {cls['location']}\n\n"
-        
-        message += "Have a great day! 🎓\n\n"
-        message += "📝 **Upload your notes:** https://YOUR-VERCEL-URL.vercel.app"
-        await self.send_message(message)
+        # Rendered when the schedule loaded; only re-rendered if today's classes changed since
+        weekday = datetime.now(TIMEZONE).weekday()
+        await self.send_message(DIGESTS.morning(self.user_key, SCHEDULE_INDEX, weekday))
     
     async def send_evening_summary(self):
         """Send evening summary"""
-        tomorrow = datetime.now(TIMEZONE) + timedelta(days=1)
-        tomorrow_weekday = tomorrow.strftime('%a')
-        
-        # Hardcoded schedule data (same as morning)
-        hardcoded_schedule = [
-            {
-                'class_code': "1203",
-                'class_name': "مهارات التعلم والتفكير والبحث",
-                'location': "Building 02, Floor 2, Wing A, Room 320",
-                'days_of_week': "Mon",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل احمد عبدالله باصويل"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 302",
-                'days_of_week': "Sun",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 415",
-                'days_of_week': "Tue",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "10:00:00",
-                'end_time': "10:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي"
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن"
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب (عملي)",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن"
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي"
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء (تمارين)",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي"
-            },
-            {
-                'class_code': "—",
-                'class_name': "اللياقة والثقافة الصحية",
-                'location': "TBA",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "تغريد محمد عثمان"
-            }
-        ]
-        
-        # Filter classes for tomorrow
-        tomorrow_classes = [cls for cls in hardcoded_schedule if cls['days_of_week'] == tomorrow_weekday]
-        
-        message = "🌙 End of Day Summary\n\n"
-        
-        if tomorrow_classes:
-            # Sort classes by start time
-            tomorrow_classes.sort(key=lambda x: x['start_time'])
-            
-            # Combine consecutive classes with same class code
-            combined_tomorrow_classes = []
-            i = 0
-            while i < len(tomorrow_classes):
-                current_class = tomorrow_classes[i]
-                combined_class = current_class.copy()
-                
-                # Check if next class is the same class code and consecutive
-                while (i + 1 < len(tomorrow_classes) and 
-                       tomorrow_classes[i + 1]['class_code'] == current_class['class_code'] and
-                       tomorrow_classes[i + 1]['start_time'] == current_class['end_time']):
-                    # Combine with next class
-                    combined_class['end_time'] = tomorrow_classes[i + 1]['end_time']
-                    i += 1
-                
-                combined_tomorrow_classes.append(combined_class)
-                i += 1
-            
-            message += "📅 **Tomorrow's Classes:**\n"
-            for cls in combined_tomorrow_classes:
-                # Convert time to AM/PM format
-                start_time = datetime.strptime(cls['start_time'], '%H:%M:%S').strftime('%I:%M %p')
-                end_time = datetime.strptime(cls['end_time'], '%H:%M:%S').strftime('%I:%M %p')
-                
-                message += f"📚 **{cls['class_name']}** ({cls['class_code']})\n"
-                message += f"⏰ Time: {start_time} - {end_time}\n"
-                message += f"📍 Location: {cls['location']}\n\n"
-        else:
-            message += "📅 No classes scheduled for tomorrow!\n\n"
-        
-        message += "Sweet dreams! 😴\n\n"
-        message += "📝 **Upload your notes:** https://YOUR-VERCEL-URL.vercel.app"
-        await self.send_message(message)
+        tomorrow = datetime.now(TIMEZONE).date() + timedelta(days=1)
+        active = ACADEMIC_CALENDAR is None or ACADEMIC_CALENDAR.is_active(tomorrow)
+        await self.send_message(DIGESTS.evening(self.user_key, SCHEDULE_INDEX, tomorrow.weekday(), active=active))
     
-    async def send_preclass_reminder(self, class_info):
+    async def send_preclass_reminder(self, class_info, minutes=None):
         """Send preclass reminder for a specific class"""
-        start_time = datetime.strptime(class_info['start_time'], '%H:%M:%S').strftime('%I:%M %p')
-        end_time = datetime.strptime(class_info['end_time'], '%H:%M:%S').strftime('%I:%M %p')
-        
-        message = f"🔔 **Class Reminder**\n\n"
-        message += f"📚 **{class_info['class_name']}** ({class_info['class_code']})\n"
-        message += f"⏰ Starts in a few minutes: {start_time} - {end_time}\n"
-        message += f"📍 Location: {class_info['location']}\n\n"
-        message += "Don't forget to bring your materials! 📝"
-        
-        await self.send_message(message)
+        # Classes with several reminders get a message naming the offset the event was planned for
+        minutes = offset_label(PRECLASS, class_info, minutes)
+        await self.send_message(DIGESTS.class_message(PRECLASS, class_info, minutes=minutes))
     
-    async def send_after_class_reminder(self, class_info):
+    async def send_after_class_reminder(self, class_info, minutes=None):
         """Send after class reminder to upload notes"""
-        message = f"📝 **Class Finished**\n\n"
-        message += f"📚 **{class_info['class_name']}** ({class_info['class_code']}) just ended.\n\n"
-        message += "Don't forget to upload your notes while they're fresh in your mind! 🧠\n\n"
-        message += "📝 **Upload your notes:** https://YOUR-VERCEL-URL.vercel.app"
-        
-        await self.send_message(message)
+        minutes = offset_label(AFTERCLASS, class_info, minutes)
+        await self.send_message(DIGESTS.class_message(AFTERCLASS, class_info, minutes=minutes))
     
     async def send_test_message(self):
         """Send a test message"""
@@ -420,6 +80,17 @@ class TelegramNotifier:
 # Initialize the notifier
 notifier = TelegramNotifier()
 
+async def dispatch_reminder(event: ReminderEvent):
+    """Send the notification for a due reminder event"""
+    if event.kind == PRECLASS:
+        await notifier.send_preclass_reminder(event.payload, event.minutes)
+    elif event.kind == AFTERCLASS:
+        await notifier.send_after_class_reminder(event.payload, event.minutes)
+    elif event.kind == MORNING:
+        await notifier.send_morning_reminder()
+    elif event.kind == EVENING:
+        await notifier.send_evening_summary()
+
 async def main():
     """Main function to run scheduled tasks"""
     print("Starting Telegram notification bot...")
@@ -427,203 +98,14 @@ async def main():
     # Send a startup message
     await notifier.send_test_message()
     
-    # Track sent notifications to avoid duplicates
-    sent_notifications = set()
+    # Render the week's messages now so sends only look them up
+    DIGESTS.warm(notifier.user_key, SCHEDULE_INDEX)
     
-    # Schedule tasks
-    while True:
-        now = datetime.now(TIMEZONE)
-        current_time = now.time()
-        today_weekday = now.strftime('%a')
-        
-        # Get today's classes
-        hardcoded_schedule = [
-            {
-                'class_code': "1203",
-                'class_name': "مهارات التعلم والتفكير والبحث",
-                'location': "Building 02, Floor 2, Wing A, Room 320",
-                'days_of_week': "Mon",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل احمد عبدالله باصويل",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 302",
-                'days_of_week': "Sun",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 415",
-                'days_of_week': "Tue",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "08:00:00",
-                'end_time': "09:50:00",
-                'instructor_name': "منيره نامي حمد النامي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 316",
-                'days_of_week': "Wed",
-                'start_time': "10:00:00",
-                'end_time': "10:50:00",
-                'instructor_name': "منيره نامي حمد النامي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 02, Floor 2, Wing A, Room 318",
-                'days_of_week': "Thu",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1001",
-                'class_name': "مهارات اللغة الإنجليزية (1)",
-                'location': "Building 03, Floor 2, Wing A, Room 424",
-                'days_of_week': "Mon",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "منيره نامي حمد النامي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1202",
-                'class_name': "مهارات الحاسب (عملي)",
-                'location': "Building 02, Floor 2, Wing A, Room 306",
-                'days_of_week': "Tue",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "اروى عبدالله محمد المقرن",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "10:00:00",
-                'end_time': "11:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "1103",
-                'class_name': "مقدمة في الإحصاء (تمارين)",
-                'location': "Building 02, Floor 2, Wing A, Room 305",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "امل منصور فرح العبدلي الفيفي",
-                'remind_before_minutes': 15
-            },
-            {
-                'class_code': "—",
-                'class_name': "اللياقة والثقافة الصحية",
-                'location': "TBA",
-                'days_of_week': "Sun",
-                'start_time': "13:00:00",
-                'end_time': "14:50:00",
-                'instructor_name': "تغريد محمد عثمان",
-                'remind_before_minutes': 15
-            }
-        ]
-        
-        # Filter classes for today
-        today_classes = [cls for cls in hardcoded_schedule if cls['days_of_week'] == today_weekday]
-        
-        # Check for preclass and after class notifications
-        for cls in today_classes:
-            start_time = datetime.strptime(cls['start_time'], '%H:%M:%S').time()
-            end_time = datetime.strptime(cls['end_time'], '%H:%M:%S').time()
-            
-            # Calculate reminder time (X minutes before class starts)
-            reminder_time = (datetime.combine(now.date(), start_time) - timedelta(minutes=cls['remind_before_minutes'])).time()
-            
-            # Check if it's time for preclass reminder
-            if (current_time.hour == reminder_time.hour and 
-                current_time.minute == reminder_time.minute):
-                notification_key = f"preclass_{cls['class_code']}_{cls['start_time']}_{now.date()}"
-                if notification_key not in sent_notifications:
-                    await notifier.send_preclass_reminder(cls)
-                    sent_notifications.add(notification_key)
-            
-            # Check if it's time for after class reminder (5 minutes after class ends)
-            after_class_time = (datetime.combine(now.date(), end_time) + timedelta(minutes=5)).time()
-            if (current_time.hour == after_class_time.hour and 
-                current_time.minute == after_class_time.minute):
-                notification_key = f"afterclass_{cls['class_code']}_{cls['end_time']}_{now.date()}"
-                if notification_key not in sent_notifications:
-                    await notifier.send_after_class_reminder(cls)
-                    sent_notifications.add(notification_key)
-        
-        # Morning reminder at 7:00 AM
-        if current_time.hour == 7 and current_time.minute == 0:
-            await notifier.send_morning_reminder()
-            await asyncio.sleep(60)  # Wait 1 minute to avoid duplicate sends
-        
-        # Evening summary at 9:00 PM
-        elif current_time.hour == 21 and current_time.minute == 0:
-            await notifier.send_evening_summary()
-            await asyncio.sleep(60)  # Wait 1 minute to avoid duplicate sends
-        
-        # Clear old notifications at midnight to reset for new day
-        if current_time.hour == 0 and current_time.minute == 0:
-            sent_notifications.clear()
-        
-        # Check every minute
-        await asyncio.sleep(60)
+    # Fire reminders from a timer queue instead of polling every minute
+    engine = ReminderEngine(TIMEZONE, dispatch_reminder, calendar=ACADEMIC_CALENDAR)
+    engine.add_planner(DailyReminderPlanner(TIMEZONE, SCHEDULE_INDEX))
+    # Open connections a few minutes before the 07:00 and 21:00 digests
+    await asyncio.gather(engine.run(), keep_warm(bot, [TIMEZONE]))
 
 if __name__ == "__main__":
     if not TELEGRAM_BOT_TOKEN:
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Telegram Stub
+A local stand-in for the Bot API endpoints the bots call, with injectable latency, errors and 429s
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import time as _time
+from collections import Counter
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qsl
+
+STUB_BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Stub', 'username': 'stub_bot'}
+
+
+class TelegramStub:
+    """HTTP/1.1 keep-alive server answering getMe, sendMessage and editMessageText like the Bot API"""
+
+    def __init__(self, latency_seconds: float = 0.05, jitter_seconds: float = 0.02,
+                 error_rate: float = 0.0, retry_after_rate: float = 0.0, retry_after_seconds: int = 1,
+                 seed: Optional[int] = None):
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+        self.error_rate = error_rate
+        self.retry_after_rate = retry_after_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.random = random.Random(seed)
+        self.requests = Counter()  # Per API method
+        self.errors = 0
+        self.retry_afters = 0
+        self.messages: Dict[Any, int] = Counter()  # Messages accepted per chat
+        self._message_ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start listening; returns the base_url to hand to telegram.Bot"""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/bot"
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            # Let every handler see its connection close rather than cancelling it mid-read
+            for _ in range(100):
+                if not self._connections:
+                    break
+                await asyncio.sleep(0.01)
+            await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                path, headers, body = request
+                status, payload = await self._handle(path, headers, body)
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode('ascii') + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, Dict[str, str], bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        _, path, _ = line.decode('latin-1').split(' ', 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+        return path, headers, body
+
+    def _params(self, headers: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        if not body:
+            return {}
+        if headers.get('content-type', '').startswith('application/json'):
+            return json.loads(body)
+        return dict(parse_qsl(body.decode('utf-8')))
+
+    async def _handle(self, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict[str, Any]]:
+        method = path.rstrip('/').rsplit('/', 1)[-1]
+        self.requests[method] += 1
+        delay = self.latency_seconds + self.random.uniform(0, self.jitter_seconds)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        roll = self.random.random()
+        if roll < self.retry_after_rate:
+            self.retry_afters += 1
+            return 429, {
+                'ok': False, 'error_code': 429,
+                'description': f"Too Many Requests: retry after {self.retry_after_seconds}",
+                'parameters': {'retry_after': self.retry_after_seconds},
+            }
+        if roll < self.retry_after_rate + self.error_rate:
+            self.errors += 1
+            return 400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: injected failure'}
+
+        params = self._params(headers, body)
+        if method == 'getMe':
+            return 200, {'ok': True, 'result': STUB_BOT_USER}
+        if method in ('sendMessage', 'editMessageText'):
+            chat_id = params.get('chat_id')
+            if method == 'sendMessage':
+                self.messages[chat_id] += 1
+                message_id = next(self._message_ids)
+            else:
+                message_id = int(params.get('message_id', 0))
+            return 200, {'ok': True, 'result': {
+                'message_id': message_id,
+                'date': int(_time.time()),
+                'chat': {'id': int(chat_id) if str(chat_id).lstrip('-').isdigit() else 0, 'type': 'private'},
+                'from': STUB_BOT_USER,
+                'text': params.get('text', ''),
+            }}
+        return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+
+    def report(self) -> str:
+        requests = ", ".join(f"{method}={count}" for method, count in sorted(self.requests.items()))
+        return (f"Stub: {sum(self.messages.values())} messages accepted, {self.retry_afters} 429s, "
+                f"{self.errors} errors injected ({requests or 'no requests'})")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Telegram Transport
+One keep-alive connection pool per bot, warmed up shortly before the morning and evening broadcasts
+"""
+
+import asyncio
+import os
+import time as _time
+from datetime import datetime, time, timedelta
+from typing import Iterable, Optional, Sequence
+
+import httpx
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from reminder_engine import MAX_SLEEP_SECONDS, local_timestamp, seconds_of_day
+
+# Enough connections for the outbound queue's sends in flight during a burst
+POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', '32'))
+# Idle connections are kept this long, so a pool warmed before a broadcast is still open when it starts
+KEEPALIVE_SECONDS = float(os.getenv('TELEGRAM_KEEPALIVE_SECONDS', '600'))
+CONNECT_TIMEOUT_SECONDS = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT_SECONDS = float(os.getenv('TELEGRAM_READ_TIMEOUT', '10'))
+# Wait this long for a free pooled connection instead of failing the send
+POOL_TIMEOUT_SECONDS = float(os.getenv('TELEGRAM_POOL_TIMEOUT', '10'))
+HTTP_VERSION = os.getenv('TELEGRAM_HTTP_VERSION', '1.1')
+
+PREWARM_MINUTES = int(os.getenv('TELEGRAM_PREWARM_MINUTES', '3'))
+PREWARM_CONNECTIONS = int(os.getenv('TELEGRAM_PREWARM_CONNECTIONS', '8'))
+
+# Local times of the digest broadcasts (DailyReminderPlanner and TimezoneBucket defaults)
+BROADCAST_TIMES = (time(7, 0), time(21, 0))
+
+
+def build_request(pool_size: int = POOL_SIZE, keepalive_seconds: float = KEEPALIVE_SECONDS) -> HTTPXRequest:
+    """HTTPXRequest with a shared pool that keeps idle connections open between bursts"""
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive_seconds,
+    )
+    return HTTPXRequest(
+        connection_pool_size=pool_size,
+        connect_timeout=CONNECT_TIMEOUT_SECONDS,
+        read_timeout=READ_TIMEOUT_SECONDS,
+        write_timeout=READ_TIMEOUT_SECONDS,
+        pool_timeout=POOL_TIMEOUT_SECONDS,
+        http_version=HTTP_VERSION,
+        httpx_kwargs={'limits': limits},
+    )
+
+
+def build_bot(token: str, base_url: str = 'https://api.telegram.org/bot') -> Bot:
+    """base_url can point at a local stand-in such as telegram_stub.TelegramStub"""
+    return Bot(token=token, base_url=base_url, request=build_request())
+
+
+async def prewarm(bot: Bot, connections: int = PREWARM_CONNECTIONS) -> int:
+    """Open connections ahead of a burst with concurrent getMe calls; returns how many succeeded"""
+    results = await asyncio.gather(*(bot.get_me() for _ in range(connections)), return_exceptions=True)
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        print(f"Pre-warming Telegram connections: {len(failures)} of {connections} failed: {failures[0]}")
+    return connections - len(failures)
+
+
+def next_prewarm(now: float, timezones: Iterable, times: Sequence[time] = BROADCAST_TIMES,
+                 lead_minutes: int = PREWARM_MINUTES) -> Optional[float]:
+    """Epoch seconds of the next warm-up: lead_minutes before the earliest upcoming broadcast"""
+    upcoming = []
+    for timezone in timezones:
+        today = datetime.fromtimestamp(now, timezone).date()
+        for day in (today, today + timedelta(days=1)):
+            for at in times:
+                warm_at = local_timestamp(timezone, day, seconds_of_day(at)) - lead_minutes * 60
+                if warm_at > now:
+                    upcoming.append(warm_at)
+    return min(upcoming) if upcoming else None
+
+
+async def keep_warm(bot: Bot, timezones: Iterable, times: Sequence[time] = BROADCAST_TIMES,
+                    lead_minutes: int = PREWARM_MINUTES, connections: int = PREWARM_CONNECTIONS):
+    """Pre-warm the pool before every broadcast in any of the timezones, forever"""
+    timezones = list(timezones)
+    while True:
+        warm_at = next_prewarm(_time.time(), timezones, times, lead_minutes)
+        if warm_at is None:
+            return
+        # Short sleeps so wall-clock jumps are noticed, like the reminder engine
+        while _time.time() < warm_at:
+            await asyncio.sleep(min(warm_at - _time.time(), MAX_SLEEP_SECONDS))
+        warmed = await prewarm(bot, connections)
+        print(f"Pre-warmed {warmed} Telegram connections")
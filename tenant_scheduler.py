@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Multi-Tenant Scheduler
+Runs reminders for every active user from the classes and users tables in one asyncio process
+"""
+
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import pytz
+
+from reminder_engine import (
+    ReminderEngine, ReminderEvent, local_timestamp, seconds_of_day, class_offsets,
+    AFTER_CLASS_MINUTES, MORNING, EVENING
+)
+from schedule_index import ScheduleIndex, WEEKDAYS, parse_days, parse_time_seconds
+from broadcast_window import BROADCAST_WINDOW_MINUTES, BROADCAST_MAX_PER_SECOND, spread_offsets
+from scheduler_metrics import Scheduled, scheduled_delivery
+from shard_leases import partition_for
+
+DEFAULT_TIMEZONE = 'Asia/Riyadh'
+DEFAULT_REMIND_BEFORE_MINUTES = 30  # Same default the ingestion code writes
+PAGE_SIZE = 1000
+
+# (kind, local seconds, minutes): one timer list per distinct fire time and offset
+TimerKey = Tuple[str, int, int]
+
+
+@dataclass
+class Tenant:
+    user_id: str
+    timezone: str
+    chat_id: Optional[str] = None
+    discord_user_id: Optional[str] = None
+    display_name: Optional[str] = None
+    index: ScheduleIndex = field(default_factory=ScheduleIndex)
+
+
+# deliver(kind, tenant, class_info, minutes) sends one notification; class_info and minutes are None for digests
+Deliver = Callable[[str, Tenant, Optional[Dict[str, Any]], Optional[int]], Awaitable[None]]
+
+# deliver_batch(kind, deliveries, minutes) sends every (tenant, class_info) of one event in a single call
+DeliverBatch = Callable[[str, List[Tuple[Tenant, Optional[Dict[str, Any]]]], Optional[int]], Awaitable[None]]
+
+# prepare(tenant, day) runs when a tenant's local day is planned, ahead of its first send
+Prepare = Callable[[Tenant, date], None]
+
+
+def fetch_all(query, page_size: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+    """Read every row of a PostgREST query page by page"""
+    rows = []
+    start = 0
+    while True:
+        page = query.range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+def resolve_timezone(name: Optional[str]) -> str:
+    """Fall back to the default timezone for empty or unknown names"""
+    if name and name in pytz.all_timezones_set:
+        return name
+    return DEFAULT_TIMEZONE
+
+
+def load_tenants(supabase_client, chat_ids: Optional[Dict[str, str]] = None,
+                 classes: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Tenant]:
+    """Load active users and their active classes, one schedule index per user"""
+    chat_ids = chat_ids or {}
+    users = fetch_all(supabase_client.table('users').select('*').eq('active', True).order('id'))
+    if classes is None:
+        classes = fetch_all(supabase_client.table('classes').select('*').eq('active', True).order('id'))
+
+    classes_by_user = defaultdict(list)
+    for cls in classes:
+        classes_by_user[cls.get('user_id')].append(cls)
+
+    tenants = {}
+    for user in users:
+        user_id = user['id']
+        tenants[user_id] = Tenant(
+            user_id=user_id,
+            timezone=resolve_timezone(user.get('timezone')),
+            chat_id=user.get('telegram_chat_id') or chat_ids.get(user_id),
+            discord_user_id=user.get('discord_user_id'),
+            display_name=user.get('display_name'),
+            index=ScheduleIndex(classes_by_user.get(user_id, []))
+        )
+    return tenants
+
+
+def bucket_by_timezone(tenants: Dict[str, Tenant]) -> Dict[str, List[Tenant]]:
+    buckets = defaultdict(list)
+    for tenant in tenants.values():
+        buckets[tenant.timezone].append(tenant)
+    return dict(buckets)
+
+
+class TimezoneBucket:
+    """All tenants sharing a timezone; each fire time is computed once for the bucket"""
+
+    def __init__(self, timezone_name: str, tenants: List[Tenant],
+                 morning_at: time = time(7, 0),
+                 evening_at: time = time(21, 0),
+                 after_class_minutes: Sequence[int] = AFTER_CLASS_MINUTES,
+                 window_minutes: int = BROADCAST_WINDOW_MINUTES,
+                 max_per_second: int = BROADCAST_MAX_PER_SECOND):
+        self.name = timezone_name
+        self.timezone = pytz.timezone(timezone_name)
+        self.tenants = tenants
+        self.morning_at = morning_at
+        self.evening_at = evening_at
+        self.after_class_minutes = after_class_minutes
+        self.window_minutes = window_minutes
+        self.max_per_second = max_per_second
+        self._timers: List[Dict[TimerKey, List[Tuple[Tenant, Dict[str, Any]]]]] = []
+        self._digest_groups: Dict[int, List[Tuple[Tenant, None]]] = {}
+        self.compile()
+
+    def compile(self):
+        """Group every class reminder of the bucket by (weekday, kind, local seconds, minutes), and digests by window offset"""
+        offsets = spread_offsets((tenant.user_id for tenant in self.tenants),
+                                 self.window_minutes, self.max_per_second)
+        groups = defaultdict(list)
+        for tenant in self.tenants:
+            groups[offsets[tenant.user_id]].append((tenant, None))
+        self._digest_groups = dict(sorted(groups.items()))
+
+        timers = [defaultdict(list) for _ in WEEKDAYS]
+        for tenant in self.tenants:
+            for weekday in range(len(WEEKDAYS)):
+                for start, end, cls in tenant.index.on_weekday(weekday):
+                    for timer in self._offsets(start, end, cls):
+                        timers[weekday][timer].append((tenant, cls))
+        self._timers = timers
+
+    def _offsets(self, start: int, end: int, cls: Dict[str, Any]) -> List[TimerKey]:
+        """Every (kind, local seconds, minutes) timer of the class; extra offsets are just more timer lists"""
+        return [
+            (kind, seconds, minutes)
+            for kind, minutes, seconds in class_offsets(cls, start, end, DEFAULT_REMIND_BEFORE_MINUTES,
+                                                        self.after_class_minutes)
+        ]
+
+    def _timer_keys(self, cls: Optional[Dict[str, Any]]) -> List[Tuple[int, TimerKey]]:
+        if not cls or cls.get('active', True) is False or not cls.get('start_time') or not cls.get('end_time'):
+            return []
+        offsets = self._offsets(parse_time_seconds(cls['start_time']), parse_time_seconds(cls['end_time']), cls)
+        return [(weekday, timer) for weekday in parse_days(cls.get('days_of_week')) for timer in offsets]
+
+    def patch(self, tenant: Tenant, old_cls: Optional[Dict[str, Any]],
+              new_cls: Optional[Dict[str, Any]]) -> List[Tuple[int, TimerKey]]:
+        """Move one class between timer lists; returns the (weekday, timer) pairs it joined"""
+        for weekday, timer in self._timer_keys(old_cls):
+            deliveries = self._timers[weekday].get(timer)
+            if deliveries:
+                # Mutated in place: pending events share these lists
+                deliveries[:] = [d for d in deliveries if not (d[0] is tenant and d[1] is old_cls)]
+        added = self._timer_keys(new_cls)
+        for weekday, timer in added:
+            self._timers[weekday][timer].append((tenant, new_cls))
+        return added
+
+    def class_event(self, day: date, timer: TimerKey) -> ReminderEvent:
+        kind, seconds, minutes = timer
+        return ReminderEvent(
+            local_timestamp(self.timezone, day, seconds),
+            kind,
+            f"{kind}_{self.name}_{seconds}_{minutes}m_{day}",
+            self._timers[day.weekday()][timer],
+            minutes
+        )
+
+    def plan(self, day: date) -> List[ReminderEvent]:
+        """One event per distinct fire time; the payload lists every delivery due then"""
+        events = []
+        # Digests go out over the broadcast window, each tenant at its own fixed offset
+        for offset, deliveries in self._digest_groups.items():
+            events.append(ReminderEvent(local_timestamp(self.timezone, day, seconds_of_day(self.morning_at) + offset),
+                                        MORNING, f"morning_{self.name}_{offset}_{day}", deliveries))
+            events.append(ReminderEvent(local_timestamp(self.timezone, day, seconds_of_day(self.evening_at) + offset),
+                                        EVENING, f"evening_{self.name}_{offset}_{day}", deliveries))
+        for timer in list(self._timers[day.weekday()]):
+            events.append(self.class_event(day, timer))
+        return events
+
+
+class MultiTenantScheduler:
+    """One reminder engine per timezone bucket, all sharing one event loop"""
+
+    def __init__(self, supabase_client, deliver: Deliver,
+                 chat_ids: Optional[Dict[str, str]] = None,
+                 max_concurrent_sends: int = 20,
+                 clock=None,
+                 ledger=None,
+                 feed=None,
+                 shard=None,
+                 prepare: Optional[Prepare] = None,
+                 calendar=None,
+                 report_daily: bool = True,
+                 deliver_batch: Optional[DeliverBatch] = None,
+                 broadcast_window_minutes: int = BROADCAST_WINDOW_MINUTES):
+        self.supabase = supabase_client
+        self.deliver = deliver
+        self.deliver_batch = deliver_batch  # Optional; replaces one task per recipient, e.g. when nothing blocks
+        self.broadcast_window_minutes = broadcast_window_minutes
+        self.prepare = prepare  # Optional per-tenant hook, e.g. pre-rendering the day's messages
+        self.calendar = calendar  # Optional AcademicCalendar shared by every timezone
+        self.report_daily = report_daily  # Each engine prints its lateness report at rollover
+        self.chat_ids = chat_ids or {}
+        self.clock = clock
+        self.ledger = ledger
+        self.feed = feed  # Optional ClassChangeFeed for incremental reloads
+        self.shard = shard  # Optional ShardCoordinator; only users in its partitions are served
+        self.tenants: Dict[str, Tenant] = {}
+        self.class_owners: Dict[Any, str] = {}  # class id -> user id, to route deletes
+        self.buckets: Dict[str, TimezoneBucket] = {}
+        self.engines: Dict[str, ReminderEngine] = {}
+        self._send_slots = asyncio.Semaphore(max_concurrent_sends)
+        self._catch_ups: Set[asyncio.Task] = set()
+
+    def load(self):
+        """Load tenants from the database and group them by timezone"""
+        classes = self.feed.load_initial() if self.feed else None
+        self.use_tenants(load_tenants(self.supabase, self.chat_ids, classes))
+
+    def use_tenants(self, tenants: Dict[str, Tenant]):
+        """Serve an already built set of tenants (loaded from the database or synthetic)"""
+        self.tenants = tenants
+        self.class_owners = {
+            cls.get('id'): tenant.user_id
+            for tenant in self.tenants.values()
+            for weekday in range(len(WEEKDAYS))
+            for _, _, cls in tenant.index.on_weekday(weekday)
+        }
+        self.buckets = {
+            name: TimezoneBucket(name, tenants, window_minutes=self.broadcast_window_minutes)
+            for name, tenants in bucket_by_timezone(self.tenants).items()
+        }
+        class_count = sum(len(tenant.index) for tenant in self.tenants.values())
+        print(f"Loaded {len(self.tenants)} users, {class_count} class slots in {len(self.buckets)} timezones")
+
+    def apply_class_changes(self, rows: List[Dict[str, Any]]):
+        """Patch changed class rows into their user's index and reschedule only their timers"""
+        for row in rows:
+            user_id = row.get('user_id') or self.class_owners.get(row.get('id'))
+            tenant = self.tenants.get(user_id)
+            if tenant is None:
+                print(f"Skipping class {row.get('id')}: user {user_id} is not loaded")
+                continue
+
+            old_cls = tenant.index.upsert(row)
+            new_cls = None if row.get('active', True) is False else row
+            if new_cls:
+                self.class_owners[row['id']] = tenant.user_id
+            else:
+                self.class_owners.pop(row.get('id'), None)
+
+            bucket = self.buckets[tenant.timezone]
+            added = bucket.patch(tenant, old_cls, new_cls)
+
+            # Future weekdays pick the change up when they are planned; today needs new timers now
+            engine = self.engines.get(bucket.name)
+            if engine is None:
+                continue
+            today = engine.today()
+            if not engine.is_active(today):
+                continue
+            for weekday, timer in added:
+                if weekday != today.weekday():
+                    continue
+                event = bucket.class_event(today, timer)
+                if event.fire_at >= engine.clock.time():
+                    engine.schedule(event)
+
+    async def _deliver_one(self, kind: str, tenant: Tenant, class_info, minutes: Optional[int]):
+        async with self._send_slots:
+            try:
+                await self.deliver(kind, tenant, class_info, minutes)
+            except Exception as e:
+                print(f"Error delivering {kind} to {tenant.user_id}: {e}")
+
+    async def dispatch(self, event: ReminderEvent):
+        """Fan an event out to every tenant it covers"""
+        await self._dispatch_to(event)
+
+    async def _dispatch_to(self, event: ReminderEvent, partitions: Optional[Set[int]] = None):
+        deliveries = event.payload if self.shard is None else self._claim_owned(event, partitions)
+        if self.deliver_batch is not None:
+            try:
+                await self.deliver_batch(event.kind, deliveries, event.minutes)
+            except Exception as e:
+                print(f"Error delivering {event.key}: {e}")
+            return
+        if len(deliveries) == 1:
+            tenant, class_info = deliveries[0]
+            await self._deliver_one(event.kind, tenant, class_info, event.minutes)
+            return
+        await asyncio.gather(*(
+            self._deliver_one(event.kind, tenant, class_info, event.minutes)
+            for tenant, class_info in deliveries
+        ))
+
+    def _claim_owned(self, event: ReminderEvent, partitions: Optional[Set[int]] = None) -> List[Tuple[Tenant, Any]]:
+        """This shard's share of an event; the ledger records each partition's share, never the whole event"""
+        by_partition = defaultdict(list)
+        for tenant, class_info in event.payload:
+            partition = partition_for(tenant.user_id, self.shard.partitions)
+            if (partitions is None or partition in partitions) and self.shard.owns_partition(partition):
+                by_partition[partition].append((tenant, class_info))
+        if self.ledger is None:
+            return [delivery for group in by_partition.values() for delivery in group]
+        now = self.clock.time() if self.clock else None
+        return [
+            delivery
+            for partition, group in by_partition.items()
+            if self.ledger.claim(f"{event.key}#p{partition}", now)
+            for delivery in group
+        ]
+
+    def _start_catch_up(self, gained: Dict[int, Optional[float]]):
+        # Runs beside the lease loop, so a long catch-up never delays renewing the leases
+        task = asyncio.create_task(self.catch_up(gained))
+        self._catch_ups.add(task)
+        task.add_done_callback(self._catch_ups.discard)
+
+    async def catch_up(self, gained: Dict[int, Optional[float]]):
+        """Send today's already-due events to users of partitions this shard just took over
+
+        gained maps each partition to when its previous owner stopped sending (None if it never had one);
+        events older than that or than the grace window are left alone.
+        """
+        for name, engine in self.engines.items():
+            today = engine.today()
+            if not engine.is_active(today):
+                continue
+            now = engine.clock.time()
+            for event in sorted(self.buckets[name].plan(today), key=lambda e: e.fire_at):
+                if event.fire_at > now or now - event.fire_at > engine.grace_seconds:
+                    continue
+                partitions = {p for p, since in gained.items() if since is None or event.fire_at >= since}
+                if partitions:
+                    scheduled_delivery.set(Scheduled(event.kind, event.fire_at))
+                    try:
+                        await self._dispatch_to(event, partitions)
+                    except Exception as e:
+                        print(f"Error catching up {event.key}: {e}")
+
+    def _prepare_day(self, bucket: TimezoneBucket, day: date) -> List[ReminderEvent]:
+        """Planner that runs the prepare hook for this shard's tenants; schedules nothing"""
+        for tenant in bucket.tenants:
+            if self.shard is None or self.shard.owns_user(tenant.user_id):
+                try:
+                    self.prepare(tenant, day)
+                except Exception as e:
+                    print(f"Error preparing {day} for {tenant.user_id}: {e}")
+        return []
+
+    async def run(self):
+        if not self.buckets:
+            self.load()
+        for name, bucket in self.buckets.items():
+            # With shards the ledger is claimed per partition in dispatch, so a share this shard
+            # did not own stays unclaimed for whoever catches it up
+            engine = ReminderEngine(bucket.timezone, self.dispatch, clock=self.clock,
+                                    ledger=None if self.shard else self.ledger, calendar=self.calendar,
+                                    report_daily=self.report_daily)
+            if self.prepare:
+                engine.add_planner(lambda day, bucket=bucket: self._prepare_day(bucket, day))
+            engine.add_planner(bucket.plan)
+            self.engines[name] = engine
+        tasks = [engine.run() for engine in self.engines.values()]
+        if self.feed:
+            tasks.append(self.feed.run(self.apply_class_changes))
+        if self.shard:
+            self.shard.rebalance()
+            tasks.append(self.shard.run(on_acquire=self._start_catch_up))
+        await asyncio.gather(*tasks)
+
+    def stop(self):
+        for engine in self.engines.values():
+            engine.stop()
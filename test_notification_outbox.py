@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Notification outbox tests
+Run with: python -m unittest test_notification_outbox
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from notification_outbox import FLUSH_BATCH_SIZE, NotificationOutbox
+from outbound_queue import DEFAULT_PRIORITY
+
+
+class RecordingTransport:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, priority=0):
+        await asyncio.sleep(0)
+        self.sent.append((chat_id, text))
+        return len(self.sent)
+
+
+class FlakyTransport:
+    """Fails the first send, then records every send with its options"""
+    def __init__(self):
+        self.calls = 0
+        self.sent = []
+
+    async def send_message(self, chat_id, text, priority=0, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionError("network down")
+        self.sent.append((chat_id, text, priority, kwargs))
+
+
+class NotificationOutboxTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'outbox.db')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_burst_larger_than_one_flush_batch(self):
+        """Sends that fill a batch flush synchronously; every caller must still be able to await its write"""
+        async def burst():
+            transport = RecordingTransport()
+            outbox = NotificationOutbox(transport, self.path)
+            count = FLUSH_BATCH_SIZE * 2 + 200
+            results = await asyncio.gather(
+                *(outbox.send_message(i % 100, f"message {i}") for i in range(count)),
+                return_exceptions=True
+            )
+            outbox.flush()
+            return outbox, transport, count, results
+
+        outbox, transport, count, results = asyncio.run(burst())
+        errors = [r for r in results if isinstance(r, BaseException)]
+        self.assertEqual(errors, [])
+        self.assertEqual(len(transport.sent), count)
+        self.assertEqual(outbox.delivered, count)
+        self.assertEqual(len(outbox), 0)
+        outbox.close()
+
+    def test_retry_replays_send_options(self):
+        """Options given to send_message survive a failed attempt and reach the transport on retry"""
+        async def fail_then_retry():
+            transport = FlakyTransport()
+            outbox = NotificationOutbox(transport, self.path)
+            with self.assertRaises(ConnectionError):
+                await outbox.send_message(7, "*hi*", parse_mode='Markdown')
+            outbox.flush()
+            rows = outbox.due(now=float('inf'))
+            for row in rows:
+                await outbox._retry(row)
+            outbox.flush()
+            return outbox, transport
+
+        outbox, transport = asyncio.run(fail_then_retry())
+        self.assertEqual(transport.sent, [('7', "*hi*", DEFAULT_PRIORITY, {'parse_mode': 'Markdown'})])
+        self.assertEqual(len(outbox), 0)
+        outbox.close()
+
+    def test_rejects_options_that_cannot_be_stored(self):
+        async def send():
+            outbox = NotificationOutbox(RecordingTransport(), self.path)
+            try:
+                with self.assertRaises(TypeError):
+                    await outbox.send_message(7, "hi", reply_markup=object())
+                return len(outbox)
+            finally:
+                outbox.close()
+
+        self.assertEqual(asyncio.run(send()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()